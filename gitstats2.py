@@ -44,6 +44,14 @@ def main(args_orig) :
         'processes': 8,
         'start_date': '',
         'lines_by_date': 0,
+        'single_pass': 0,
+        'incremental': 0,
+        'cache_dir': '',
+        'cache_max_mb': 512,
+        'lines_by_date_sampling': '',
+        'executor': 'thread',
+        'spooled_output': 0,
+        'shortstat_shards': 0,
     }
     def usage() :
         print(f"""
@@ -63,7 +71,9 @@ Please see the manual page for more details.""")
             key, value = val.split('=', 1)
             if key not in conf :
                 raise KeyError(f"No such key \"{key}\" in config")
-            if isinstance(conf[key], int) :
+            if key == 'lines_by_date' and value == 'approx' :
+                conf[key] = value
+            elif isinstance(conf[key], int) :
                 conf[key] = int(value)
             else :
                 conf[key] = value
@@ -86,7 +96,7 @@ Please see the manual page for more details.""")
         sys.exit(1)
 
     git_statistics = gitstats2_collect_data.GitStatisticsData(conf, gitpaths)
-    git_statistics.collect()
+    git_statistics.collect(outputpath)
     statistics_writer = gitstats2_collect_data.GitStatisticsWriter(git_statistics)
     statistics_writer.write(outputpath)
     prev_dir = os.getcwd()
@@ -99,7 +109,7 @@ Please see the manual page for more details.""")
 
     time_end = time.time()
     exectime_total = time_end - time_start
-    exectime_commands = gitstats2_collect_data.get_pipe_output.exectime_commands
+    exectime_commands = gitstats2_collect_data.get_exectime_commands()
     print(f"Execution time {exectime_total:.5f} secs, {exectime_commands:.5f} secs \
 ({(exectime_commands/exectime_total):.2%}) in external commands")
 
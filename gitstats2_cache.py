@@ -0,0 +1,152 @@
+# -*- python-indent-offset: 4 -*-
+"""
+Copyright (C) 2021-  Marian Piatkowski
+
+This file is a part of GitStats2.
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, version 3.
+
+This program is distributed in the hope that it will be useful, but
+WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import os
+import time
+import zlib
+import pickle
+import sqlite3
+from collections import Counter
+from contextlib import contextmanager
+
+filename = 'gitstats2_cache.sqlite'
+
+class ObjectCache :
+    # Results of git queries that only depend on immutable object ids, e.g. the line
+    # count of a blob or the files of a tree, kept in a SQLite database that several
+    # gitstats2 runs on the same host may share. The least recently used entries are
+    # evicted once the database grows beyond max_size bytes.
+    chunk_size = 500
+
+    def __init__(self) :
+        self.connection = None
+        self.max_size = 0
+        self.hits = Counter()
+        self.misses = Counter()
+
+    def is_open(self) :
+        return self.connection is not None
+
+    def open(self, cache_dir, max_size) :
+        os.makedirs(cache_dir, exist_ok=True)
+        # concurrent runs wait for each other's write transactions
+        self.connection = sqlite3.connect(
+            os.path.join(cache_dir, filename), timeout=60.0, isolation_level=None)
+        # switching to WAL may report a locked database right away, without waiting
+        # for the busy timeout, while another run sets up the same database
+        for retry in range(100) :
+            try :
+                self._create_tables()
+                break
+            except sqlite3.OperationalError :
+                if retry == 99 :
+                    raise
+                time.sleep(0.1)
+        self.max_size = max_size
+        self.hits = Counter()
+        self.misses = Counter()
+
+    def close(self) :
+        if self.connection is None :
+            return
+        self._evict()
+        self.connection.close()
+        self.connection = None
+
+    def get_many(self, kind, keys) :
+        # returns a dict with the cached values among keys
+        if self.connection is None :
+            return {}
+        keys = list(dict.fromkeys(keys))
+        found = {}
+        for i in range(0, len(keys), self.chunk_size) :
+            chunk = keys[i:i+self.chunk_size]
+            placeholders = ','.join('?' * len(chunk))
+            rows = self.connection.execute(
+                f"SELECT key, value FROM objects WHERE kind = ? AND key IN ({placeholders})",
+                (kind, *chunk))
+            for key, value in rows :
+                found[key] = pickle.loads(zlib.decompress(value))
+        if found :
+            now = time.time()
+            with self._transaction() :
+                self.connection.executemany(
+                    'UPDATE objects SET last_used = ? WHERE kind = ? AND key = ?',
+                    [(now, kind, key) for key in found])
+        self.hits[kind] += len(found)
+        self.misses[kind] += len(keys) - len(found)
+        return found
+
+    def put_many(self, kind, items) :
+        if self.connection is None :
+            return
+        now = time.time()
+        rows = []
+        for key, value in items :
+            data = zlib.compress(pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+            rows.append((kind, key, data, len(data), now))
+        with self._transaction() :
+            self.connection.executemany(
+                'INSERT OR REPLACE INTO objects (kind, key, value, size, last_used) '
+                'VALUES (?, ?, ?, ?, ?)', rows)
+
+    def _create_tables(self) :
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS objects ('
+            'kind TEXT NOT NULL, key TEXT NOT NULL, value BLOB NOT NULL, '
+            'size INTEGER NOT NULL, last_used REAL NOT NULL, PRIMARY KEY (kind, key))')
+        self.connection.execute(
+            'CREATE INDEX IF NOT EXISTS objects_last_used ON objects (last_used)')
+
+    def get_report(self) :
+        return [f"{kind}: {self.hits[kind]} hits, {self.misses[kind]} misses"
+                for kind in sorted(set(self.hits) | set(self.misses))]
+
+    def _evict(self) :
+        # drop the least recently used entries down to 90% of max_size
+        with self._transaction() :
+            total_size = self.connection.execute(
+                'SELECT COALESCE(SUM(size), 0) FROM objects').fetchone()[0]
+            if total_size <= self.max_size :
+                return
+            excess = total_size - int(0.9 * self.max_size)
+            evicted = []
+            for rowid, size in self.connection.execute(
+                    'SELECT rowid, size FROM objects ORDER BY last_used') :
+                if excess <= 0 :
+                    break
+                evicted.append((rowid,))
+                excess -= size
+            self.connection.executemany('DELETE FROM objects WHERE rowid = ?', evicted)
+
+    @contextmanager
+    def _transaction(self) :
+        # BEGIN IMMEDIATE takes the write lock up front, so concurrent writers queue up
+        # on the busy timeout instead of failing on a lock upgrade
+        self.connection.execute('BEGIN IMMEDIATE')
+        try :
+            yield
+        except BaseException :
+            self.connection.execute('ROLLBACK')
+            raise
+        self.connection.execute('COMMIT')
+
+object_cache = ObjectCache()
@@ -26,11 +26,25 @@ import datetime
 import re
 import calendar
 import collections
+import threading
+import tempfile
+import mmap
+import hashlib
+from contextlib import contextmanager
 from enum import IntEnum
-from multiprocessing import Pool
+from concurrent.futures import ThreadPoolExecutor
 from collections import namedtuple
 from collections import Counter
-from functools import partial
+from functools import partial, lru_cache
+from gitstats2_trace import execution_trace
+try :
+    import numpy as np
+except ImportError :
+    np = None
+from gitstats2_commit_index import CommitIndex, CommitIndexRecord
+from gitstats2_commit_table import CommitTable
+from gitstats2_cache import object_cache
+from gitstats2_executor import shared_executor
 
 if sys.version_info < (3, 6) :
     print("Python 3.6 or higher is required for gitstats2", file=sys.stderr)
@@ -40,77 +54,413 @@ def cwd_git() :
     success = False
     try :
         subprocess.check_call(
-            'git rev-parse --show-toplevel',
+            ['git', 'rev-parse', '--show-toplevel'],
             stdout=subprocess.DEVNULL,
-            stderr=subprocess.DEVNULL,
-            shell=True)
+            stderr=subprocess.DEVNULL)
         success = True
     except subprocess.CalledProcessError :
         success = False
     return success
 
-def get_pipe_output(cmds, quiet=False) :
-    start = time.time()
-    cmd = ' | '.join(cmds)
+def _announce_command(cmd_text, quiet) :
     if not quiet and os.isatty(1) :
-        print('>> ' + cmd, end=' ')
+        print('>> ' + cmd_text, end=' ')
         sys.stdout.flush()
+
+def _command_kind(cmd_text) :
+    # e.g. "git log" for "git -C <path> log --shortstat ..."
+    words = iter(cmd_text.split())
+    program = next(words, '')
+    for word in words :
+        if word == '-C' :
+            next(words, None)
+        elif not word.startswith('-') :
+            return f"{program} {word}"
+    return program
+
+def _account_command(cmd_text, start, end, quiet, bytes_out) :
+    if not quiet :
+        if os.isatty(1) :
+            print('\r', end=' ')
+        print(f"[{(end-start):.5f}] >> {cmd_text}")
+    execution_trace.add_command(_command_kind(cmd_text), cmd_text, start, end, bytes_out)
+
+def _run_output(cmd, cmd_text, quiet) :
+    start = time.time()
+    _announce_command(cmd_text, quiet)
     process = subprocess.Popen(
         cmd,
         stdout=subprocess.PIPE,
         stderr=subprocess.STDOUT,
-        shell=True,
-        encoding='utf8')
+        shell=isinstance(cmd, str),
+        encoding='utf8',
+        errors='replace')
     output = process.communicate()[0]
-    end = time.time()
-    if not quiet :
-        if os.isatty(1) :
-            print('\r', end=' ')
-        print(f"[{(end-start):.5f}] >> {' | '.join(cmds)}")
-    get_pipe_output.exectime_commands += (end - start)
+    _account_command(cmd_text, start, time.time(), quiet, len(output))
     return output.rstrip('\n')
 
-get_pipe_output.exectime_commands = 0.0
+def _run_lines(cmd, cmd_text, quiet) :
+    # Trailing empty lines are dropped as in _run_output.
+    start = time.time()
+    _announce_command(cmd_text, quiet)
+    process = subprocess.Popen(
+        cmd,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        shell=isinstance(cmd, str),
+        encoding='utf8',
+        errors='replace')
+    bytes_out = 0
+    try :
+        empty_lines = 0
+        for line in process.stdout :
+            bytes_out += len(line)
+            line = line.rstrip('\n')
+            if not line :
+                empty_lines += 1
+                continue
+            for _ in range(empty_lines) :
+                yield ''
+            empty_lines = 0
+            yield line
+    finally :
+        process.stdout.close()
+        process.wait()
+        _account_command(cmd_text, start, time.time(), quiet, bytes_out)
+
+def get_pipe_output(cmds, quiet=False) :
+    cmd = ' | '.join(cmds)
+    return _run_output(cmd, cmd, quiet)
+
+def get_exectime_commands() :
+    # Wall-clock time with at least one external command running. Commands of the pool
+    # workers overlap, so their durations are not summed.
+    return execution_trace.get_command_wall_time()
+
+def get_pipe_lines(cmds, quiet=False) :
+    # Like get_pipe_output, but yields the lines while the pipeline is still writing them.
+    cmd = ' | '.join(cmds)
+    yield from _run_lines(cmd, cmd, quiet)
+
+def get_command_output(args, quiet=False) :
+    # Runs a single command given as argument list without a shell.
+    return _run_output(args, ' '.join(args), quiet)
+
+def get_command_lines(args, quiet=False) :
+    yield from _run_lines(args, ' '.join(args), quiet)
+
+@contextmanager
+def get_command_buffer(args, quiet=False) :
+    # Runs a single command with its output spooled to a temporary file and gives the
+    # output as undecoded bytes, memory-mapped instead of read into memory. The buffer
+    # is only valid in the with block.
+    cmd_text = ' '.join(args)
+    start = time.time()
+    _announce_command(cmd_text, quiet)
+    with tempfile.TemporaryFile() as spool :
+        subprocess.run(args, stdout=spool, stderr=subprocess.DEVNULL, check=False)
+        size = os.fstat(spool.fileno()).st_size
+        _account_command(cmd_text, start, time.time(), quiet, size)
+        # an empty file cannot be mapped
+        output = mmap.mmap(spool.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+        try :
+            yield output
+        finally :
+            if size :
+                output.close()
+
+def skip_commit_lines(lines) :
+    # in-process replacement of `grep -v ^commit` for `git rev-list --pretty`
+    return (line for line in lines if not line.startswith('commit'))
+
+_quoted_path_escapes = {
+    'a' : b'\a', 'b' : b'\b', 't' : b'\t', 'n' : b'\n', 'v' : b'\v', 'f' : b'\f',
+    'r' : b'\r', '"' : b'"', '\\' : b'\\'}
+
+def unquote_path(path) :
+    # Paths with special or non-ASCII characters are C-quoted by git, e.g. "caf\303\251".
+    # Undecodable bytes end up as surrogates, as in os.fsdecode.
+    if not path.startswith('"') :
+        return path
+    decoded = bytearray()
+    pos = 1
+    while pos < len(path) - 1 :
+        char = path[pos]
+        if char != '\\' :
+            decoded += char.encode('utf8')
+            pos += 1
+        elif path[pos+1] in _quoted_path_escapes :
+            decoded += _quoted_path_escapes[path[pos+1]]
+            pos += 2
+        else :
+            decoded.append(int(path[pos+1:pos+4], 8))
+            pos += 4
+    return decoded.decode('utf8', errors='surrogateescape')
 
 # ****************************************************************************************
 # ****************************************************************************************
 
+class GitCatFileBatch :
+    # long-lived `git cat-file --batch` of the repository in the current directory,
+    # blob ids are fed by a separate thread while the contents are read back
+    chunk_size = 1 << 20
+
+    def __init__(self) :
+        self.process = subprocess.Popen(
+            ['git', 'cat-file', '--batch'],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL)
+        self.bytes_read = 0
+
+    def __enter__(self) :
+        return self
+
+    def __exit__(self, *_exc_info) :
+        self.close()
+
+    def close(self) :
+        self.process.stdin.close()
+        self.process.stdout.close()
+        self.process.wait()
+
+    def count_lines(self, blob_ids) :
+        feeder = threading.Thread(target=self._feed, args=(blob_ids,), daemon=True)
+        feeder.start()
+        linecounts = [self._read_linecount() for _ in blob_ids]
+        feeder.join()
+        return linecounts
+
+    def _feed(self, blob_ids) :
+        stdin = self.process.stdin
+        for blob_id in blob_ids :
+            stdin.write(blob_id.encode('ascii') + b'\n')
+        stdin.flush()
+
+    def read_object(self, object_id) :
+        # returns (type, contents), type is None for a missing object
+        self.process.stdin.write(object_id.encode('ascii') + b'\n')
+        self.process.stdin.flush()
+        stdout = self.process.stdout
+        header = stdout.readline().split()
+        if len(header) != 3 :
+            return (None, b'')
+        contents = stdout.read(int(header[2]))
+        # contents are terminated by an additional newline
+        stdout.read(1)
+        self.bytes_read += len(contents)
+        return (header[1].decode('ascii'), contents)
+
+    def _read_linecount(self) :
+        # Outputs "<object id> <type> <size>" followed by the contents,
+        # or "<object id> missing"
+        stdout = self.process.stdout
+        header = stdout.readline().split()
+        if len(header) != 3 :
+            return 0
+        remaining = int(header[2])
+        linecount = 0
+        while remaining > 0 :
+            chunk = stdout.read(min(remaining, self.chunk_size))
+            if not chunk :
+                raise EOFError('git cat-file --batch terminated unexpectedly')
+            linecount += chunk.count(b'\n')
+            remaining -= len(chunk)
+        # contents are terminated by an additional newline
+        stdout.read(1)
+        self.bytes_read += int(header[2])
+        return linecount
+
+class GitBlobReader :
+    # a few `git cat-file --batch` processes per repository sharing the blob queries
+    def __init__(self, processes) :
+        self.batches = [GitCatFileBatch() for _ in range(max(1, processes))]
+
+    def __enter__(self) :
+        return self
+
+    def __exit__(self, *_exc_info) :
+        self.close()
+
+    def close(self) :
+        for batch in self.batches :
+            batch.close()
+
+    def count_lines(self, blob_ids, quiet=False) :
+        start = time.time()
+        bytes_read = sum(batch.bytes_read for batch in self.batches)
+        num_batches = min(len(self.batches), len(blob_ids))
+        linecounts = []
+        if num_batches :
+            chunk_size = -(-len(blob_ids) // num_batches)
+            chunks = [blob_ids[i:i+chunk_size] for i in range(0, len(blob_ids), chunk_size)]
+            with ThreadPoolExecutor(max_workers=len(chunks)) as executor :
+                for chunk_linecounts in executor.map(
+                        lambda batch, chunk : batch.count_lines(chunk), self.batches, chunks) :
+                    linecounts.extend(chunk_linecounts)
+        bytes_read = sum(batch.bytes_read for batch in self.batches) - bytes_read
+        _account_command(
+            f"git cat-file --batch ({len(blob_ids)} blobs)", start, time.time(), quiet, bytes_read)
+        return linecounts
+
+class GitTreeReader :
+    # Recursive file listings of trees like `git ls-tree -r`, read through
+    # `git cat-file --batch`. Trees are content addressed, so the listing of a subtree
+    # at a given path is built once and shared by all revisions containing it, and the
+    # path strings are shared along with it.
+    max_trees = 1 << 16
+
+    def __init__(self) :
+        self.batch = GitCatFileBatch()
+        self.file_trees = collections.OrderedDict()
+
+    def __enter__(self) :
+        return self
+
+    def __exit__(self, *_exc_info) :
+        self.close()
+
+    def close(self) :
+        self.batch.close()
+
+    def get_file_tree(self, tree_id, subdir='') :
+        # subdir as given by `git rev-parse --show-prefix`, e.g. 'lib/'
+        path = ''
+        for name in subdir.rstrip('/').split('/') if subdir else [] :
+            tree_id = next((
+                object_id for mode, entry_name, object_id in self._read_tree(tree_id)
+                if mode == '40000' and entry_name == name), None)
+            if tree_id is None :
+                return ()
+            path += name + '/'
+        return self._get_file_tree(tree_id, path)
+
+    def _get_file_tree(self, tree_id, path) :
+        key = (tree_id, path)
+        file_tree = self.file_trees.get(key)
+        if file_tree is not None :
+            self.file_trees.move_to_end(key)
+            return file_tree
+        paths = []
+        for mode, name, object_id in self._read_tree(tree_id) :
+            if mode == '40000' :
+                paths.extend(self._get_file_tree(object_id, f"{path}{name}/"))
+            elif mode != '160000' :
+                # skip submodules
+                paths.append(sys.intern(path + name))
+        file_tree = tuple(paths)
+        self.file_trees[key] = file_tree
+        if len(self.file_trees) > self.max_trees :
+            self.file_trees.popitem(last=False)
+        return file_tree
+
+    def _read_tree(self, tree_id) :
+        # Tree entries are "<mode> <name>\0<binary object id>"
+        _, contents = self.batch.read_object(tree_id)
+        id_length = len(tree_id) // 2
+        entries = []
+        pos = 0
+        while pos < len(contents) :
+            space = contents.index(b' ', pos)
+            nul = contents.index(b'\0', space)
+            entries.append((
+                contents[pos:space].decode('ascii'),
+                contents[space+1:nul].decode('utf8', errors='surrogateescape'),
+                contents[nul+1:nul+1+id_length].hex()))
+            pos = nul + 1 + id_length
+        return entries
+
 class GitStatisticsParallel :
+    @staticmethod
+    def traced_call(func, arg) :
+        # runs in a pool worker, the trace events of the call are handed back to the parent
+        mark = execution_trace.mark()
+        result = func(arg)
+        return (result, execution_trace.take_since(mark))
+
+    @staticmethod
+    def merge_traced_results(traced_results) :
+        results = []
+        for result, events in traced_results :
+            results.append(result)
+            execution_trace.merge(events)
+        return results
+
+    @staticmethod
+    def map_unordered(func, args, processes) :
+        # runs on the shared executor, started with processes workers unless configured,
+        # and yields (arg, result) as the tasks complete
+        if shared_executor.executor is None :
+            shared_executor.configure(shared_executor.backend, processes)
+        if not shared_executor.is_process_backend() :
+            yield from shared_executor.imap_unordered(func, args)
+            return
+        for arg, traced_result in shared_executor.imap_unordered(
+                partial(GitStatisticsParallel.traced_call, func), args) :
+            yield (arg, GitStatisticsParallel.merge_traced_results([traced_result])[0])
+
     @staticmethod
     def ext_lines_by_blob(ext_blob, processes) :
-        with Pool(processes=processes) as pool :
-            ext_linecount = pool.starmap(GitStatisticsParallel.add_linecount, ext_blob)
-            pool.terminate()
-            pool.join()
-        return ext_linecount
+        blob_ids = [blob_id for _, blob_id in ext_blob]
+        linecount_by_blob = GitStatisticsParallel.linecount_by_blob(blob_ids, processes)
+        return [(ext, linecount_by_blob[blob_id]) for ext, blob_id in ext_blob]
 
     @staticmethod
-    def add_linecount(ext, blob_id) :
-        cmd = f"git cat-file blob {blob_id}"
-        pipe_out = get_pipe_output([cmd, 'wc -l'])
-        return (ext, int(pipe_out))
+    def linecount_by_blob(blob_ids, processes) :
+        linecount_by_blob = object_cache.get_many('lines_in_blob', blob_ids)
+        missing = [
+            blob_id for blob_id in dict.fromkeys(blob_ids) if blob_id not in linecount_by_blob]
+        if missing :
+            with GitBlobReader(min(processes, len(missing))) as blob_reader :
+                linecounts = blob_reader.count_lines(missing)
+            object_cache.put_many('lines_in_blob', zip(missing, linecounts))
+            linecount_by_blob.update(zip(missing, linecounts))
+        return linecount_by_blob
 
     @staticmethod
-    def file_tree_by_revlist(lines, prefix_path, processes, quiet=False) :
-        with Pool(processes=processes) as pool :
-            time_files_commit = pool.map(
-                partial(GitStatisticsParallel.add_time_files_commit,
-                        prefix_path=prefix_path, quiet=quiet),
-                lines)
-            pool.terminate()
-            pool.join()
+    def file_tree_by_revlist(lines, prefix_path, quiet=False) :
+        # Lines are "<stamp> <tree> <commit hash>", the file tree only depends on
+        # the tree and the prefix.
+        lines = list(lines)
+        cache_keys = [' '.join([line.split()[1], *prefix_path]) for line in lines]
+        file_tree_by_key = GitStatisticsParallel._get_cached_file_trees(cache_keys)
+        missing = {
+            key : line.split()[1] for line, key in zip(lines, cache_keys)
+            if key not in file_tree_by_key}
+        if missing :
+            file_tree_by_key.update(
+                GitStatisticsParallel._read_file_trees(missing, prefix_path, quiet))
+        time_files_commit = []
+        for line, key in zip(lines, cache_keys) :
+            timestamp, _, commit_hash = line.split()
+            time_files_commit.append((timestamp, file_tree_by_key[key], commit_hash))
         return time_files_commit
 
     @staticmethod
-    def add_time_files_commit(line, prefix_path, quiet) :
-        timestamp, rev, commit_hash = line.split()
-        pipe_out = get_pipe_output([f"git ls-tree -r \"{rev}\" {prefix_path}"], quiet=quiet)
-        file_tree = GitStatisticsParallel.file_tree_by_revision(pipe_out)
-        return (timestamp, file_tree, commit_hash)
+    def _get_cached_file_trees(cache_keys) :
+        return {
+            key : tuple(map(sys.intern, file_tree)) for key, file_tree in
+            object_cache.get_many('files_in_tree', cache_keys).items()}
+
+    @staticmethod
+    def _read_file_trees(tree_id_by_key, prefix_path, quiet) :
+        # reads the file trees of the trees in one `git cat-file --batch` and caches them
+        start = time.time()
+        with GitTreeReader() as tree_reader :
+            subdir = prefix_path[-1] if prefix_path else ''
+            file_tree_by_key = {
+                key : tree_reader.get_file_tree(tree_id, subdir)
+                for key, tree_id in tree_id_by_key.items()}
+            bytes_read = tree_reader.batch.bytes_read
+        _account_command(
+            f"git cat-file --batch ({len(tree_id_by_key)} trees)", start, time.time(), quiet,
+            bytes_read)
+        object_cache.put_many('files_in_tree', file_tree_by_key.items())
+        return file_tree_by_key
 
     @staticmethod
     def file_tree_by_revision(pipe_out) :
-        lines = pipe_out.split('\n')
+        lines = [line for line in pipe_out.split('\n') if line]
         lines_splitted = list(map(lambda line : re.split(r'\s+', line, 4), lines))
         # skip submodules
         lines_filtered = list(filter(lambda line : line[0] != '160000', lines_splitted))
@@ -118,20 +468,152 @@ class GitStatisticsParallel :
 
     @staticmethod
     def lines_by_authors(file_tree, commit_hash, processes) :
-        with Pool(processes=processes) as pool :
-            lines_by_authors_list = pool.map(
-                partial(GitStatisticsParallel.add_lines_by_authors,
-                        commit_hash=commit_hash),
-                file_tree)
-            pool.terminate()
-            pool.join()
-        return sum(lines_by_authors_list, collections.Counter())
+        return GitStatisticsParallel.lines_by_authors_by_commit(
+            [(commit_hash, file_tree)], processes)[commit_hash]
+
+    @staticmethod
+    def lines_by_authors_by_commit(commit_file_trees, processes) :
+        # (commit hash, file tree) pairs, the blames of all commits share one queue and the
+        # author counts of each file are added to its commit as they arrive
+        lines_by_authors_by_commit = {
+            commit_hash : Counter() for commit_hash, _ in commit_file_trees}
+        for (commit_hash, _), lines_by_authors in GitStatisticsParallel.blame_as_completed(
+                [(commit_hash, revfile) for commit_hash, file_tree in commit_file_trees
+                 for revfile in file_tree], processes) :
+            lines_by_authors_by_commit[commit_hash].update(lines_by_authors)
+        return lines_by_authors_by_commit
+
+    @staticmethod
+    def lines_by_authors_by_file(commit_files, processes) :
+        # blames (commit hash, path) pairs, possibly of different commits, in one queue
+        return dict(GitStatisticsParallel.blame_as_completed(commit_files, processes))
+
+    @staticmethod
+    def blame_as_completed(commit_files, processes) :
+        # Yields ((commit hash, path), author counts) in the order the blames finish,
+        # cached ones first. The largest files are blamed first so that no worker is
+        # still busy with a huge file while the others idle at the end.
+        cache_keys = [f"{commit_hash}:{revfile}" for commit_hash, revfile in commit_files]
+        # the author names of the blames depend on the mailmap as well
+        mailmap_id = GitStatisticsParallel.get_mailmap_id() if object_cache.is_open() else ''
+        cache_kind = f"lines_by_authors@{mailmap_id}" if mailmap_id else 'lines_by_authors'
+        cached = object_cache.get_many(cache_kind, cache_keys)
+        key_by_commit_file = {}
+        for commit_file, key in zip(commit_files, cache_keys) :
+            if key in cached :
+                yield (commit_file, cached[key])
+            else :
+                key_by_commit_file[commit_file] = key
+        if not key_by_commit_file :
+            return
+        size_by_key = GitStatisticsParallel.size_by_object(list(key_by_commit_file.values()))
+        missing = sorted(
+            key_by_commit_file, key=lambda commit_file :
+            size_by_key[key_by_commit_file[commit_file]], reverse=True)
+        blamed = []
+        for commit_file, lines_by_authors in GitStatisticsParallel.map_unordered(
+                GitStatisticsParallel.add_lines_by_authors_of_commit_file, missing, processes) :
+            blamed.append((key_by_commit_file[commit_file], lines_by_authors))
+            if len(blamed) >= object_cache.chunk_size :
+                object_cache.put_many(cache_kind, blamed)
+                blamed = []
+            yield (commit_file, lines_by_authors)
+        object_cache.put_many(cache_kind, blamed)
+
+    @staticmethod
+    def get_mailmap_id() :
+        # A digest of the mailmaps git blame maps the author names with, the .mailmap of
+        # the work tree, the file of mailmap.file and the blob of mailmap.blob, which is
+        # HEAD:.mailmap in a bare repository. Empty without any mailmap.
+        mailmap_files = [
+            path for path in (
+                '.mailmap',
+                os.path.expanduser(get_command_output(
+                    ['git', 'config', '--get', 'mailmap.file'], quiet=True)))
+            if path and os.path.isfile(path)]
+        mailmap_blob = get_command_output(
+            ['git', 'config', '--get', 'mailmap.blob'], quiet=True) or 'HEAD:.mailmap'
+        object_ids = get_command_output(
+            ['git', 'rev-parse', '-q', '--verify', f"{mailmap_blob}^{{blob}}"], quiet=True).split()
+        if mailmap_files :
+            object_ids += get_command_output(
+                ['git', 'hash-object', '--', *mailmap_files], quiet=True).split()
+        if not object_ids :
+            return ''
+        return hashlib.sha1(' '.join(object_ids).encode('ascii')).hexdigest()[:12]
+
+    @staticmethod
+    def shortstat_of_commits(chunk, quiet=False) :
+        # (index, commit hashes, log args, prefix path) -> the records of
+        # LogShortStatData.parse_marked_shortstat of the commits in the given order
+        # A chunk that git fails on would silently miss its records, the cumulative
+        # statistics of all later chunks would then be off.
+        _, commit_hashes, log_args, prefix_path = chunk
+        cmd_text = f"git log --shortstat --stdin ({len(commit_hashes)} commits)"
+        start = time.time()
+        process = subprocess.run(
+            ['git', 'log', '--shortstat', '--stdin', *log_args, '--pretty=format:%x1e%at %aN',
+             *prefix_path],
+            input=('\n'.join(commit_hashes) + '\n').encode('ascii'),
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            check=False)
+        _account_command(cmd_text, start, time.time(), quiet, len(process.stdout))
+        if process.returncode != 0 :
+            stderr = process.stderr.decode('utf8', errors='replace').strip()
+            raise RuntimeError(
+                f"{cmd_text} failed with exit status {process.returncode}: {stderr}")
+        return list(LogShortStatData.parse_marked_shortstat(process.stdout))
+
+    @staticmethod
+    def size_by_object(object_names, quiet=False) :
+        # object names like "<commit hash>:<path>", missing objects have size 0
+        start = time.time()
+        process = subprocess.run(
+            ['git', 'cat-file', '--batch-check=%(objectsize)'],
+            input='\n'.join(object_names) + '\n',
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            encoding='utf8',
+            errors='replace',
+            check=False)
+        _account_command(
+            f"git cat-file --batch-check ({len(object_names)} objects)", start, time.time(),
+            quiet, len(process.stdout))
+        return {object_name : int(size) if size.isdigit() else 0
+                for object_name, size in zip(object_names, process.stdout.split('\n'))}
+
+    @staticmethod
+    def add_lines_by_authors_of_commit_file(commit_file) :
+        commit_hash, revfile = commit_file
+        return GitStatisticsParallel.add_lines_by_authors(revfile, commit_hash)
 
     @staticmethod
     def add_lines_by_authors(revfile, commit_hash) :
-        cmd = f"git blame --line-porcelain {commit_hash} -- {revfile}"
-        pipe_out = get_pipe_output([cmd, "sed -n 's/^author //p'"], quiet=True)
-        return Counter(pipe_out.split('\n'))
+        cmd = ['git', 'blame', '--incremental', commit_hash, '--', revfile]
+        return GitStatisticsParallel.parse_blame_incremental(get_command_lines(cmd, quiet=True))
+
+    @staticmethod
+    def parse_blame_incremental(lines) :
+        # Outputs for every hunk "<commit hash> <orig line> <final line> <num lines>",
+        # the headers of the commit, e.g. "author <name>", the first time the commit
+        # appears and "filename <path>" at the end of the hunk. The warnings git writes to
+        # stderr come along in the lines and are skipped between hunks.
+        author_by_commit = {}
+        lines_by_authors = Counter()
+        hunk = None
+        for line in lines :
+            if hunk is None :
+                fields = line.split(' ')
+                if len(fields) != 4 or not fields[3].isdigit() :
+                    continue
+                hunk = (fields[0], int(fields[3]))
+            elif line.startswith('author ') :
+                author_by_commit[hunk[0]] = line[7:]
+            elif line.startswith('filename ') :
+                lines_by_authors[author_by_commit[hunk[0]]] += hunk[1]
+                hunk = None
+        return lines_by_authors
 
 # ****************************************************************************************
 # ****************************************************************************************
@@ -186,39 +668,149 @@ class ShortStatStateChangesByCommit :
 
 CommitChangesTuple = namedtuple('CommitChangesTuple', 'files inserted deleted')
 RepositoryTuple = namedtuple('RepositoryTuple', 'name prefix_path')
+HistoryRecordTuple = namedtuple(
+    'HistoryRecordTuple', 'stamp timezone tree commit_hash parents author mail changes')
+CommitDatesTuple = namedtuple(
+    'CommitDatesTuple', 'days hours weekdays months years weeks unique_days')
+
+# \x1e<stamp> <author>, optionally followed by the counts of the commit
+_marked_shortstat_record = re.compile(rb'\x1e(\d+) ([^\n]*)\n?([^\x1e]*)')
+# <stamp> <date> <time> <timezone> <author> <<mail>> after the commit line of rev-list
+_revlist_commit_record = re.compile(rb'\n(\d+) [^ ]* [^ ]* ([^ ]*) ([^\n]*)')
+
+class StatisticsRecord :
+    # Base of the slotted records kept per author and tag. The fields can also be read
+    # and written by name like the dicts the records replace, e.g. record['commits'],
+    # which is what the markdown generator does.
+    __slots__ = ()
+
+    def __getitem__(self, key) :
+        try :
+            return getattr(self, key)
+        except AttributeError :
+            raise KeyError(key) from None
+
+    def __setitem__(self, key, value) :
+        if key not in self.__slots__ :
+            raise KeyError(key)
+        setattr(self, key, value)
+
+    def get(self, key, default=None) :
+        return getattr(self, key, default)
+
+    def keys(self) :
+        return self.__slots__
+
+    def copy(self) :
+        record = object.__new__(type(self))
+        for field in self.__slots__ :
+            setattr(record, field, getattr(self, field))
+        return record
+
+    def __eq__(self, other) :
+        if type(other) is not type(self) :
+            return NotImplemented
+        return all(getattr(self, field) == getattr(other, field) for field in self.__slots__)
+
+    __hash__ = None
+
+    def __repr__(self) :
+        fields = ', '.join(f"{field}={getattr(self, field)!r}" for field in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+class AuthorStats(StatisticsRecord) :
+    __slots__ = ('commits', 'lines_added', 'lines_removed', 'first_commit_stamp',
+                 'last_commit_stamp', 'first_active_day', 'active_days')
+
+    def __init__(self) :
+        self.commits = 0
+        self.lines_added = 0
+        self.lines_removed = 0
+        self.first_commit_stamp = None
+        self.last_commit_stamp = None
+        self.first_active_day = None
+        self.active_days = ActiveDays()
+
+class TagInfo(StatisticsRecord) :
+    __slots__ = ('stamp', 'hash', 'date', 'commits', 'authors')
+
+    def __init__(self, stamp, hash_value, date) :
+        self.stamp = stamp
+        self.hash = hash_value
+        self.date = date
+        self.commits = 0
+        self.authors = {}
+
+class AuthorRegistry :
+    # Small integer ids of the author names (%aN, names after .mailmap). The statistics
+    # are keyed by these ids and the names are only looked up again for the output.
+    def __init__(self) :
+        self.ids = {}
+        self.names = []
+        self.ids_of_bytes = {}
+
+    def get_id(self, name) :
+        author_id = self.ids.setdefault(name, len(self.names))
+        if author_id == len(self.names) :
+            self.names.append(name)
+        return author_id
+
+    def get_id_of_bytes(self, name) :
+        # the name as output by git, decoded only the first time it is met
+        author_id = self.ids_of_bytes.get(name)
+        if author_id is None :
+            author_id = self.get_id(name.decode('utf8', errors='replace'))
+            self.ids_of_bytes[name] = author_id
+        return author_id
+
+    def get_ids(self, names) :
+        return [self.get_id(name) for name in names]
+
+    def get_name(self, author_id) :
+        return self.names[author_id]
+
+    def __len__(self) :
+        return len(self.names)
 
 class GitStatisticsBase :
     def __init__(self, conf, gitpaths) :
         self.configuration = conf.copy()
         self.gitpaths = gitpaths
         self.runstart_stamp = float(0.0)
+        self.author_registry = AuthorRegistry()
+        self.repository_ids = {}
         self._authors_of_repository = {}
 
     @staticmethod
     def get_gitstats2_version() :
         gitstats_repo = os.path.dirname(os.path.abspath(__file__))
         commit_range = '@'
-        cmd = f"git --git-dir={gitstats_repo}/.git --work-tree={gitstats_repo} \
-rev-parse --short {commit_range}"
-        return get_pipe_output([cmd])
+        cmd = ['git', f"--git-dir={gitstats_repo}/.git", f"--work-tree={gitstats_repo}",
+               'rev-parse', '--short', commit_range]
+        return get_command_output(cmd)
 
     @staticmethod
     def get_git_version() :
-        return get_pipe_output(['git --version'])
+        return get_command_output(['git', '--version'])
+
+    @staticmethod
+    def get_git_version_tuple() :
+        # "git version 2.39.5" -> (2, 39, 5)
+        return tuple(map(int, re.findall(r'\d+', GitStatisticsBase.get_git_version())[:3]))
 
     @staticmethod
     def decompose_gitpath(gitpath) :
-        top_level_gitpath = get_pipe_output(
-            [f"git -C {gitpath} rev-parse --show-toplevel"], quiet=True)
-        subdir_gitpath = get_pipe_output(
-            [f"git -C {gitpath} rev-parse --show-prefix"], quiet=True)
+        top_level_gitpath = get_command_output(
+            ['git', '-C', gitpath, 'rev-parse', '--show-toplevel'], quiet=True)
+        subdir_gitpath = get_command_output(
+            ['git', '-C', gitpath, 'rev-parse', '--show-prefix'], quiet=True)
         return (top_level_gitpath, subdir_gitpath)
 
     @staticmethod
     def get_prefixed_path(subdir_path) :
         if not subdir_path :
-            return ''
-        return f"-- {subdir_path}"
+            return []
+        return ['--', subdir_path]
 
     def get_log_range(self, default_range='HEAD', end_only=True) :
         commit_range = self.get_commit_range(default_range, end_only)
@@ -226,6 +818,12 @@ rev-parse --short {commit_range}"
             return f"--since=\"{self.configuration['start_date']}\" \"{commit_range}\""
         return commit_range
 
+    def get_log_range_args(self, default_range='HEAD', end_only=True) :
+        commit_range = self.get_commit_range(default_range, end_only)
+        if self.configuration['start_date'] :
+            return [f"--since={self.configuration['start_date']}", commit_range]
+        return [commit_range]
+
     def get_commit_range(self, default_range='HEAD', end_only=True) :
         if self.configuration['commit_end'] :
             if end_only or not self.configuration['commit_begin'] :
@@ -236,6 +834,19 @@ rev-parse --short {commit_range}"
     def get_runstart_stamp(self) :
         return self.runstart_stamp
 
+    def get_author_name(self, author_id) :
+        return self.author_registry.get_name(author_id)
+
+    def get_repository_id(self, repository) :
+        # repositories are numbered in the order of the git paths
+        return self.repository_ids.setdefault(repository, len(self.repository_ids))
+
+    def _get_author_stats(self, author) :
+        stats = self._authors_of_repository.get(author)
+        if stats is None :
+            stats = self._authors_of_repository[author] = AuthorStats()
+        return stats
+
     def collect(self) :
         pass
 
@@ -253,6 +864,19 @@ class LogShortStatParser :
     def decide(self, line) :
         self.decide_in_state[self.current_state](self, line)
 
+    def decide_marked(self, line) :
+        # With the commit lines marked by a leading \x1e, as of the format
+        # %x1e%at %aN, a line is told apart by its first character in any state.
+        # Returns the line without the mark.
+        if not line :
+            self.toggle(ShortStatParserState.Initial)
+        elif line[0] == '\x1e' :
+            self.toggle(ShortStatParserState.CommitInfo)
+            return line[1:]
+        else :
+            self.toggle(ShortStatParserState.ChangesByCommit)
+        return line
+
     def toggle(self, target_state) :
         self.current_state = target_state
 
@@ -264,12 +888,14 @@ class LogShortStatData(GitStatisticsBase, LogShortStatParser) :
         self.total_lines_added = {}
         self.total_lines_removed = {}
 
-        self.changes_by_date = {}
+        self.changes_by_date = CommitTable(('files', 'inserted', 'deleted', 'lines'))
         self.lines_added_by_month = {}
         self.lines_removed_by_month = {}
         self.lines_added_by_year = {}
         self.lines_removed_by_year = {}
-        self.changes_by_date_by_author = {}
+        # commits is the number of commits of the author up to the row
+        self.changes_by_date_by_author = CommitTable(
+            ('author', 'lines_added', 'lines_removed', 'commits', 'merge_commit'))
 
         self._process_in_state = [
             [self.do_nothing,] * ShortStatParserState.MaxStates
@@ -279,10 +905,19 @@ class LogShortStatData(GitStatisticsBase, LogShortStatParser) :
                 ShortStatParserState.Initial][ShortStatParserState.Initial]
         self._process_in_state[
             ShortStatParserState.Initial][
-                ShortStatParserState.ChangesByCommit] = self._set_changes_by_commit
+                ShortStatParserState.CommitInfo] = self._set_commit_info
+        self._process_in_state[
+            ShortStatParserState.ChangesByCommit][
+                ShortStatParserState.CommitInfo] = self._set_commit_info
+        self._process_in_state[
+            ShortStatParserState.CommitInfo][
+                ShortStatParserState.CommitInfo] = self._set_commit_info_after_commit_info
         self._process_in_state[
             ShortStatParserState.CommitInfo][
                 ShortStatParserState.ChangesByCommit] = self._set_changes_by_commit
+        self._commit_info = None
+        self._update_commit = self.do_nothing
+        self._update_commit_without_changes = self.do_nothing
         self._changes_by_commit = None
 
     def get_total_lines_of_code(self) :
@@ -337,55 +972,80 @@ class LogShortStatData(GitStatisticsBase, LogShortStatParser) :
         if not self.configuration['project_name'] :
             self.configuration['project_name'] = ', '.join(project_names)
 
-    def _set_changes_by_commit(self, _, line) :
+    def _set_commit_info(self, _, line) :
+        self._commit_info = line
+
+    def _set_commit_info_after_commit_info(self, repository, line) :
+        # previous commit came without changes, e.g. a merge commit
+        self._update_commit_without_changes(repository, self._commit_info)
+        self._commit_info = line
+
+    def _set_changes_by_commit(self, repository, line) :
         self._changes_by_commit = self._get_modified_counts(line)
+        self._update_commit(repository, self._commit_info)
+
+    def _parse_log_shortstat(
+            self, repository, lines, update_commit, update_commit_without_changes, marked=False) :
+        # With marked the commit lines start with \x1e and are classified without
+        # trying to parse them, otherwise the states decide on the contents of the lines.
+        self.current_state = ShortStatParserState.Initial
+        self._update_commit = update_commit
+        self._update_commit_without_changes = update_commit_without_changes
+        if marked :
+            for line in lines :
+                line = self.decide_marked(line)
+                self.process_current_state(repository.name, line)
+        else :
+            for line in lines :
+                # Outputs in chronological order:
+                # <stamp> <author>
+                # N files changed, N insertions (+), N deletions (-)
+                self.decide(line)
+                self.process_current_state(repository.name, line)
+        if self.current_state == ShortStatParserState.CommitInfo :
+            self._update_commit_without_changes(repository.name, self._commit_info)
+        self._update_commit = self.do_nothing
+        self._update_commit_without_changes = self.do_nothing
 
     def _collect_lines_modified(self, repository) :
         prefix_path = repository.prefix_path
-        log_range = self.get_log_range('HEAD')
-        self.current_state = ShortStatParserState.Initial
-        self._process_in_state[
-            ShortStatParserState.ChangesByCommit][
-                ShortStatParserState.CommitInfo] = self._update_lines_modified
-        extra = ''
+        log_range = self.get_log_range_args('HEAD')
+        extra = []
         if self.configuration['linear_linestats'] :
-            extra = '--first-parent -m'
-        cmd = f"git log --shortstat {extra} --pretty=format:\"%at %aN\" {log_range} {prefix_path}"
-        pipe_out = get_pipe_output([cmd])
-        lines = pipe_out.split('\n')
-        for line in reversed(lines) :
-            # Outputs:
-            # N files changed, N insertions (+), N deletions (-)
-            # <stamp> <author>
-            self.decide(line)
-            self.process_current_state(repository.name, line)
-        self._process_in_state[
-            ShortStatParserState.ChangesByCommit][
-                ShortStatParserState.CommitInfo] = self.do_nothing
+            extra = ['--first-parent', '-m']
+        if self._use_shortstat_records() :
+            with self._open_shortstat_records(
+                    ['--reverse', *extra], log_range, prefix_path) as records :
+                for stamp, _, changes_by_commit in records :
+                    if changes_by_commit is not None :
+                        self._add_lines_modified(repository.name, stamp, changes_by_commit)
+            return
+        cmd = ['git', 'log', '--shortstat', '--reverse', *extra, '--pretty=format:%x1e%at %aN',
+               *log_range, *prefix_path]
+        self._parse_log_shortstat(
+            repository, get_command_lines(cmd), self._update_lines_modified, self.do_nothing,
+            marked=True)
 
     def _collect_lines_modified_by_author(self, repository) :
         prefix_path = repository.prefix_path
-        log_range = self.get_log_range('@')
-        self.current_state = ShortStatParserState.Initial
-        self._process_in_state[
-            ShortStatParserState.ChangesByCommit][
-                ShortStatParserState.CommitInfo] = self._update_lines_modified_by_author
-        self._process_in_state[
-            ShortStatParserState.CommitInfo][
-                ShortStatParserState.CommitInfo] = self._update_merge_commit
-        cmd = f"git log --shortstat --date-order --pretty=format:\"%at %aN\" \
-{log_range} {prefix_path}"
-        pipe_out = get_pipe_output([cmd])
-        lines = pipe_out.split('\n')
-        for line in reversed(lines) :
-            self.decide(line)
-            self.process_current_state(repository.name, line)
-        self._process_in_state[
-            ShortStatParserState.ChangesByCommit][
-                ShortStatParserState.CommitInfo] = self.do_nothing
-        self._process_in_state[
-            ShortStatParserState.CommitInfo][
-                ShortStatParserState.CommitInfo] = self.do_nothing
+        log_range = self.get_log_range_args('@')
+        if self._use_shortstat_records() :
+            get_author_id = self.author_registry.get_id_of_bytes
+            with self._open_shortstat_records(
+                    ['--reverse', '--date-order'], log_range, prefix_path) as records :
+                for stamp, author, changes_by_commit in records :
+                    author = get_author_id(author)
+                    if changes_by_commit is None :
+                        self._add_merge_commit(repository.name, stamp, author)
+                    else :
+                        self._add_lines_modified_by_author(
+                            repository.name, stamp, author, changes_by_commit)
+            return
+        cmd = ['git', 'log', '--shortstat', '--reverse', '--date-order',
+               '--pretty=format:%x1e%at %aN', *log_range, *prefix_path]
+        self._parse_log_shortstat(
+            repository, get_command_lines(cmd),
+            self._update_lines_modified_by_author, self._update_merge_commit, marked=True)
 
     def toggle(self, target_state) :
         self.process_current_state = self._process_in_state[self.current_state][target_state]
@@ -393,29 +1053,96 @@ class LogShortStatData(GitStatisticsBase, LogShortStatParser) :
 
     @staticmethod
     def _get_modified_counts(line) :
-        numbers = tuple(map(int, re.findall(r'\d+', line)))
-        if len(numbers) == 1 :
-            changes_by_commit = CommitChangesTuple(numbers[0], inserted=0, deleted=0)
-        elif len(numbers) == 2 and line.find('(+)') != -1 :
-            changes_by_commit = CommitChangesTuple(numbers[0], inserted=numbers[1], deleted=0)
-        elif len(numbers) == 2 and line.find('(-)') != -1 :
-            changes_by_commit = CommitChangesTuple(numbers[0], inserted=0, deleted=numbers[1])
-        else :
-            changes_by_commit = CommitChangesTuple(numbers[0], inserted=numbers[1], deleted=numbers[2])
-        return changes_by_commit
+        # " N files changed, N insertions(+), N deletions(-)" where either of the last
+        # two parts may be missing, they are told apart by (+) and (-)
+        files, *changes = line.split(',')
+        inserted = deleted = 0
+        for change in changes :
+            if '(+)' in change :
+                inserted = int(change.split(None, 1)[0])
+            else :
+                deleted = int(change.split(None, 1)[0])
+        return CommitChangesTuple(int(files.split(None, 1)[0]), inserted=inserted, deleted=deleted)
+
+    def _use_shortstat_records(self) :
+        return self.configuration['spooled_output'] or self.configuration['shortstat_shards'] > 1
+
+    @contextmanager
+    def _open_shortstat_records(self, log_args, log_range, prefix_path) :
+        # Gives the records of parse_marked_shortstat in the order of the walk of
+        # `git log --shortstat <log_args>`. They are only valid in the with block, which
+        # also closes the output buffer when the records are not read to the end.
+        if self.configuration['shortstat_shards'] > 1 :
+            records = self._get_sharded_shortstat_records(log_args, log_range, prefix_path)
+            try :
+                yield records
+            finally :
+                records.close()
+            return
+        cmd = ['git', 'log', '--shortstat', *log_args, '--pretty=format:%x1e%at %aN',
+               *log_range, *prefix_path]
+        with get_command_buffer(cmd) as output :
+            records = self.parse_marked_shortstat(output)
+            try :
+                yield records
+            finally :
+                # the pending match scan holds on to the buffer
+                records.close()
+
+    def _get_sharded_shortstat_records(self, log_args, log_range, prefix_path) :
+        # The commits of the walk are split into chunks of consecutive commits whose
+        # diffs git computes in parallel. The chunks are listed without walking and their
+        # records are yielded chunk by chunk in the order of the walk, so the cumulative
+        # statistics are updated exactly as after a single `git log`.
+        commit_hashes = get_command_output(
+            ['git', 'rev-list', *log_args, *log_range, *prefix_path]).split()
+        if not commit_hashes :
+            return
+        num_chunks = min(self.configuration['shortstat_shards'], len(commit_hashes))
+        chunk_size = -(-len(commit_hashes) // num_chunks)
+        chunk_args = ['--no-walk=unsorted', *(arg for arg in log_args if arg != '--reverse')]
+        chunks = [
+            (index, commit_hashes[start:start+chunk_size], chunk_args, prefix_path)
+            for index, start in enumerate(range(0, len(commit_hashes), chunk_size))]
+        records_by_chunk = {}
+        next_chunk = 0
+        for chunk, records in GitStatisticsParallel.map_unordered(
+                GitStatisticsParallel.shortstat_of_commits, chunks,
+                self.configuration['processes']) :
+            records_by_chunk[chunk[0]] = records
+            while next_chunk in records_by_chunk :
+                yield from records_by_chunk.pop(next_chunk)
+                next_chunk += 1
+
+    @staticmethod
+    def parse_marked_shortstat(output) :
+        # Yields (stamp, author, changes or None) from the bytes of the output of
+        # `git log --shortstat --pretty=format:%x1e%at %aN`, the author undecoded.
+        for record in _marked_shortstat_record.finditer(output) :
+            stamp, author, counts = record.groups()
+            yield (int(stamp), author, LogShortStatData._get_modified_counts_of_bytes(counts))
+
+    @staticmethod
+    @lru_cache(maxsize=4096)
+    def _get_modified_counts_of_bytes(counts) :
+        # the same few counts repeat all over the history, each is decoded once
+        counts = counts.strip()
+        if not counts :
+            return None
+        return LogShortStatData._get_modified_counts(counts.decode('utf8', errors='replace'))
 
     def _update_lines_modified(self, repository, line) :
         stamp = line.split(' ')[0]
-        date = datetime.datetime.fromtimestamp(int(stamp))
-        # meld stamp and repository into a single key
-        stamp_key = ' '.join([stamp, repository])
-        (files, inserted, deleted) = self._changes_by_commit
+        self._add_lines_modified(repository, stamp, self._changes_by_commit)
+
+    def _add_lines_modified(self, repository, stamp, changes_by_commit) :
+        stamp = int(stamp)
+        date = datetime.datetime.fromtimestamp(stamp)
+        (files, inserted, deleted) = changes_by_commit
         self._update_total_lines(repository, inserted, deleted)
-        self.changes_by_date[stamp_key] = {
-            'files' : files,
-            'inserted' : inserted,
-            'deleted' : deleted,
-            'lines' : self.total_lines.get(repository, 0) }
+        self.changes_by_date.append(
+            stamp, self.get_repository_id(repository),
+            files, inserted, deleted, self.total_lines.get(repository, 0))
         self._update_lines_modified_by_month(date, inserted, deleted)
         self._update_lines_modified_by_year(date, inserted, deleted)
 
@@ -438,48 +1165,30 @@ class LogShortStatData(GitStatisticsBase, LogShortStatParser) :
     def _update_lines_modified_by_author(self, repository, line) :
         splitted_line = line.split(' ')
         stamp = splitted_line[0]
-        # meld stamp and repository into a single key
-        stamp_key = ' '.join([stamp, repository])
-        author = ' '.join(splitted_line[1:])
-        (_, inserted, deleted) = self._changes_by_commit
-        if author not in self._authors_of_repository :
-            self._authors_of_repository[author] = \
-                {'lines_added' : 0, 'lines_removed' : 0, 'commits' : 0}
-        self._authors_of_repository[author]['commits'] = \
-            self._authors_of_repository[author].get('commits', 0) + 1
-        self._authors_of_repository[author]['lines_added'] = \
-            self._authors_of_repository[author].get('lines_added', 0) + inserted
-        self._authors_of_repository[author]['lines_removed'] = \
-            self._authors_of_repository[author].get('lines_removed', 0) + deleted
-        if stamp_key not in self.changes_by_date_by_author :
-            self.changes_by_date_by_author[stamp_key] = {}
-        if author not in self.changes_by_date_by_author[stamp_key] :
-            self.changes_by_date_by_author[stamp_key][author] = {}
-        self.changes_by_date_by_author[stamp_key][author]['lines_added'] = inserted
-        self.changes_by_date_by_author[stamp_key][author]['lines_removed'] = deleted
-        self.changes_by_date_by_author[stamp_key][author]['commits'] = \
-            self._authors_of_repository[author]['commits']
+        author = self.author_registry.get_id(' '.join(splitted_line[1:]))
+        self._add_lines_modified_by_author(repository, stamp, author, self._changes_by_commit)
+
+    def _add_lines_modified_by_author(self, repository, stamp, author, changes_by_commit) :
+        (_, inserted, deleted) = changes_by_commit
+        stats = self._get_author_stats(author)
+        stats.commits += 1
+        stats.lines_added += inserted
+        stats.lines_removed += deleted
+        self.changes_by_date_by_author.append(
+            int(stamp), self.get_repository_id(repository),
+            author, inserted, deleted, stats.commits, 0)
 
     def _update_merge_commit(self, repository, line) :
         splitted_line = line.split(' ')
         stamp = splitted_line[0]
-        # meld stamp and repository into a single key
-        stamp_key = ' '.join([stamp, repository])
-        author = ' '.join(splitted_line[1:])
-        if author not in self._authors_of_repository :
-            self._authors_of_repository[author] = \
-                {'lines_added' : 0, 'lines_removed' : 0, 'commits' : 0}
-        self._authors_of_repository[author]['commits'] = \
-            self._authors_of_repository[author].get('commits', 0) + 1
-        if stamp_key not in self.changes_by_date_by_author :
-            self.changes_by_date_by_author[stamp_key] = {}
-        if author not in self.changes_by_date_by_author[stamp_key] :
-            self.changes_by_date_by_author[stamp_key][author] = {}
-        self.changes_by_date_by_author[stamp_key][author]['merge_commit'] = True
-        self.changes_by_date_by_author[stamp_key][author]['lines_added'] = 0
-        self.changes_by_date_by_author[stamp_key][author]['lines_removed'] = 0
-        self.changes_by_date_by_author[stamp_key][author]['commits'] = \
-            self._authors_of_repository[author]['commits']
+        author = self.author_registry.get_id(' '.join(splitted_line[1:]))
+        self._add_merge_commit(repository, stamp, author)
+
+    def _add_merge_commit(self, repository, stamp, author) :
+        stats = self._get_author_stats(author)
+        stats.commits += 1
+        self.changes_by_date_by_author.append(
+            int(stamp), self.get_repository_id(repository), author, 0, 0, stats.commits, 1)
 
 # ****************************************************************************************
 # ****************************************************************************************
@@ -513,46 +1222,108 @@ class GitTagsData(GitStatisticsBase) :
     def _collect_tags(self, repository) :
         self.tags[repository.name] = {}
         tags = self.tags[repository.name]
-        prefix_path = repository.prefix_path
-        lines = get_pipe_output([f'git show-ref --tags {prefix_path}']).split('\n')
-        for line in lines :
-            if not line :
+        if repository.prefix_path :
+            # `git show-ref --tags -- <subdir>` never matched a tag
+            return
+        fields = ['%(refname)', '%(objectname)', '%(objecttype)', '%(authordate:unix)',
+                  '%(*objectname)', '%(*objecttype)', '%(*authordate:unix)']
+        cmd = ['git', 'for-each-ref', f"--format={'%1f'.join(fields)}", 'refs/tags']
+        # Outputs
+        # <ref>\x1f<hash>\x1f<type>\x1f<stamp>\x1f<peeled hash>\x1f<peeled type>\x1f<peeled stamp>
+        # where the peeled fields are empty for lightweight tags
+        for line in get_command_lines(cmd) :
+            refname, hash_value, object_type, stamp, _, peeled_type, peeled_stamp = \
+                line.split('\x1f')
+            if object_type == 'tag' and peeled_type == 'tag' :
+                # tag of a tag
+                peeled_stamp = get_command_output(
+                    ['git', 'log', hash_value, '--pretty=format:%at', '-n', '1'])
+                peeled_type = 'commit'
+            if object_type == 'tag' :
+                object_type, stamp = peeled_type, peeled_stamp
+            if object_type != 'commit' :
                 continue
-            (hash_value, tag) = line.split(' ')
-            tag = tag.replace('refs/tags/', '')
-            cmd = f"git log \"{hash_value}\" --pretty=format:\"%at %aN\" -n 1"
-            output = get_pipe_output([cmd])
-            if output :
-                parts = output.split(' ')
-                stamp = int(parts[0])
-                date = datetime.datetime.fromtimestamp(stamp)
-                tags[tag] = {
-                    'stamp': stamp,
-                    'hash' : hash_value,
-                    'date' : date.strftime('%Y-%m-%d'),
-                    'commits': 0,
-                    'authors': {} }
+            stamp = int(stamp)
+            date = datetime.datetime.fromtimestamp(stamp)
+            tags[refname.replace('refs/tags/', '', 1)] = TagInfo(
+                stamp, hash_value, date.strftime('%Y-%m-%d'))
 
     def _collect_tags_info(self, repository) :
+        # The commits of a tag are the ones reachable from the tag, but not from the
+        # previous tag by date with any commits of its own, as of
+        # `git shortlog -s <tag> ^<previous tag>`. They are all attributed in a single
+        # walk over the history of the tags.
         tags = self.tags[repository.name]
-        tags_list = [(tagdetail['date'], tagname) for tagname, tagdetail in tags.items()]
-        tags_sorted_by_date_desc = [tagname for *_, tagname in sorted(tags_list,reverse=True)]
-        prev = None
-        for tag in reversed(tags_sorted_by_date_desc):
-            if prev is None:
-                cmd = f"git shortlog -s \"{tag}\""
-            else:
-                cmd = f"git shortlog -s \"{tag}\" \"^{prev}\""
-            output = get_pipe_output([cmd])
-            if not output:
+        tags_list = [(tagdetail.date, tagname) for tagname, tagdetail in tags.items()]
+        tags_sorted_by_date = [tagname for *_, tagname in sorted(tags_list)]
+        if not tags_sorted_by_date :
+            return
+        cmd = ['git', 'rev-parse', *[f"{tags[tag].hash}^{{commit}}" for tag in tags_sorted_by_date]]
+        commit_by_tag = dict(zip(tags_sorted_by_date, get_command_lines(cmd)))
+        cmd = ['git', 'log', '--topo-order', '--pretty=format:%H%x1f%P%x1f%aN',
+               *dict.fromkeys(commit_by_tag.values())]
+        # Outputs "<hash>\x1f<parents>\x1f<author>", children before their parents
+        history = [line.split('\x1f') for line in get_command_lines(cmd)]
+        tags_with_commits = self._get_tags_with_commits(history, tags_sorted_by_date, commit_by_tag)
+        commits_by_tag_author = self._count_commits_by_tag_author(
+            history, [commit_by_tag[tag] for _, tag in tags_with_commits])
+        # authors in the order of `git shortlog`
+        for (k, author), commits in sorted(commits_by_tag_author.items()) :
+            tag = tags_with_commits[k][1]
+            tags[tag].commits += commits
+            tags[tag].authors[self.author_registry.get_id(author)] = commits
+
+    @staticmethod
+    def _get_tag_bits(tagged_commits) :
+        # bit i of the mask of a tagged commit is set if the i-th tag points to it
+        tag_bits = {}
+        for i, commit_hash in enumerate(tagged_commits) :
+            tag_bits[commit_hash] = tag_bits.get(commit_hash, 0) | 1 << i
+        return tag_bits
+
+    @staticmethod
+    def _get_tags_with_commits(history, tags_sorted_by_date, commit_by_tag) :
+        # (index, tag) of the tags with commits of their own. A tag with no commits of its
+        # own is reached by the previous tag with commits.
+        tag_bits = GitTagsData._get_tag_bits(commit_by_tag[tag] for tag in tags_sorted_by_date)
+        # bit i of a commit's mask is set if the i-th tag reaches the commit
+        mask_by_tagged_commit = dict(GitTagsData._walk_tag_masks(history, tag_bits, tag_bits))
+        tags_with_commits = []
+        for i, tag in enumerate(tags_sorted_by_date) :
+            if tags_with_commits and \
+               mask_by_tagged_commit[commit_by_tag[tag]] >> tags_with_commits[-1][0] & 1 :
                 continue
-            prev = tag
-            for line in output.split('\n'):
-                parts = re.split(r'\s+', line, 2)
-                commits = int(parts[1])
-                author = parts[2]
-                tags[tag]['commits'] += commits
-                tags[tag]['authors'][author] = commits
+            tags_with_commits.append((i, tag))
+        return tags_with_commits
+
+    @staticmethod
+    def _count_commits_by_tag_author(history, tagged_commits) :
+        # Commits by (k, author) of the k-th tagged commit, counting the commits it
+        # reaches but the previous tagged commit does not.
+        # bit k of a commit's mask is set if the k-th tagged commit reaches the commit
+        tag_bits = GitTagsData._get_tag_bits(tagged_commits)
+        commits_by_tag_author = Counter()
+        authors_by_commit = {commit_hash : author for commit_hash, _, author in history}
+        for commit_hash, mask in GitTagsData._walk_tag_masks(history, tag_bits) :
+            # tags reaching the commit whose previous tag does not
+            first_reached = mask & ~(mask << 1)
+            while first_reached :
+                k = first_reached.bit_length() - 1
+                first_reached ^= 1 << k
+                commits_by_tag_author[(k, authors_by_commit[commit_hash])] += 1
+        return commits_by_tag_author
+
+    @staticmethod
+    def _walk_tag_masks(history, tag_bits, tagged_commits=None) :
+        # Yields (commit hash, mask) of the commits in history, or only of
+        # tagged_commits, with the masks of the children or-ed into their parents.
+        pending_masks = {}
+        for commit_hash, parents, _ in history :
+            mask = pending_masks.pop(commit_hash, 0) | tag_bits.get(commit_hash, 0)
+            for parent in parents.split() :
+                pending_masks[parent] = pending_masks.get(parent, 0) | mask
+            if tagged_commits is None or commit_hash in tagged_commits :
+                yield (commit_hash, mask)
 
 # ****************************************************************************************
 # ****************************************************************************************
@@ -563,8 +1334,11 @@ class GitFilesStatistics(GitStatisticsBase) :
         self.total_size = 0
         self.total_files = 0
         self.extensions = {}
-        self.files_by_stamp = {}
-        self.lines_by_date_by_author = {}
+        self.files_by_stamp = CommitTable(('files', 'delta_files'))
+        # (author, delta lines) of the authors whose lines changed, a revision without
+        # changes is kept as a row of author -1 to show up in the output
+        self.lines_by_date_by_author = CommitTable(('author', 'delta_lines'))
+        self.lines_by_date_sampling = {}
 
     def get_total_size(self) :
         return self.total_size
@@ -581,6 +1355,9 @@ class GitFilesStatistics(GitStatisticsBase) :
     def get_lines_by_date_by_author(self) :
         return self.lines_by_date_by_author
 
+    def get_lines_by_date_sampling(self) :
+        return self.lines_by_date_sampling
+
     def collect(self) :
         self.runstart_stamp = time.time()
         project_names = []
@@ -605,9 +1382,8 @@ class GitFilesStatistics(GitStatisticsBase) :
     def _collect_files(self, repository) :
         commit_range = self.get_commit_range('HEAD', end_only=True)
         prefix_path = repository.prefix_path
-        cmd = f"git ls-tree -r -l {commit_range} {prefix_path}"
-        pipe_out = get_pipe_output([cmd])
-        lines = pipe_out.split('\n')
+        cmd = ['git', 'ls-tree', '-r', '-l', commit_range, *prefix_path]
+        lines = get_command_lines(cmd)
         ext_blob = [el for el in map(self._add_ext_blob, lines) if el is not None]
         ext_lines = GitStatisticsParallel.ext_lines_by_blob(
             ext_blob, self.configuration['processes'])
@@ -643,64 +1419,492 @@ class GitFilesStatistics(GitStatisticsBase) :
             self.extensions[ext]['lines'] += lines
 
     def _collect_revlist(self, repository) :
-        log_range = self.get_log_range('HEAD')
+        log_range = self.get_log_range_args('HEAD')
         prefix_path = repository.prefix_path
-        cmd = f"git rev-list --pretty=format:\"%at %T %H\" {log_range} {prefix_path}"
-        pipe_out = get_pipe_output([cmd, 'grep -v ^commit'])
-        lines = pipe_out.strip().split('\n')
+        cmd = ['git', 'rev-list', '--reverse', '--pretty=format:%at %T %H',
+               *log_range, *prefix_path]
         # Outputs "<stamp> <revlist> <commit hash>"
-        lines.reverse()
-        time_files_commit = GitStatisticsParallel.file_tree_by_revlist(
-            lines, prefix_path, self.configuration['processes'])
-        self._update_files_by_stamp(repository.name, time_files_commit)
-        if self.configuration['lines_by_date'] :
-            lines_by_authors_by_stamp = self._lines_by_authors_by_stamp(time_files_commit)
-            self._update_lines_by_date_by_author(repository.name, lines_by_authors_by_stamp)
+        lines = skip_commit_lines(get_command_lines(cmd))
+        self._update_revlist(repository, lines)
+
+    def _update_revlist(self, repository, lines) :
+        prefix_path = repository.prefix_path
+        if not self._use_blame() and self._use_first_parent_diffs() :
+            self._update_files_by_stamp(
+                repository.name,
+                self._num_files_by_revlist(lines, self.get_log_range_args('HEAD'), prefix_path))
+        else :
+            time_files_commit = GitStatisticsParallel.file_tree_by_revlist(lines, prefix_path)
+            self._update_files_by_stamp(
+                repository.name,
+                [(timestamp, len(file_tree)) for timestamp, file_tree, _ in time_files_commit])
+            if self._use_blame() :
+                lines_by_authors_by_stamp = self._lines_by_authors_by_stamp(
+                    repository, time_files_commit, self.get_log_range_args('HEAD'))
+                self._update_lines_by_date_by_author(repository.name, lines_by_authors_by_stamp)
+        if self.configuration['lines_by_date'] == 'approx' :
+            self._update_lines_by_date_by_author(
+                repository.name, self._approx_lines_by_authors_by_stamp(repository))
+
+    def _use_blame(self) :
+        # lines_by_date=1 blames the revisions, lines_by_date=approx estimates without,
+        # leaving out the lines written in merge commits
+        return self.configuration['lines_by_date'] and \
+            self.configuration['lines_by_date'] != 'approx'
+
+    def _approx_lines_by_authors_by_stamp(self, repository) :
+        # Follows the lines added and removed by the authors of all commits file by file.
+        # The lines a commit removes from a file are taken from the earlier authors of the
+        # file in proportion to the lines they still own there. Merges give a stamp but no
+        # changes: `git log` shows no diff for them, so lines written while resolving
+        # conflicts are not followed and count towards the error against blame.
+        log_range = self.get_log_range_args('HEAD')
+        cmd = ['git', 'log', '--reverse', '--date-order', '--numstat', '-M',
+               '--pretty=format:%x1e%at%x1f%aN', *log_range, *repository.prefix_path]
+        lines_by_authors_by_file = {}
+        lines_by_authors = Counter()
+        for timestamp, author, numstat in self._parse_numstat(get_command_lines(cmd)) :
+            for added, deleted, old_path, path in numstat :
+                if old_path != path :
+                    lines_by_authors_by_file[path] = \
+                        lines_by_authors_by_file.pop(old_path, Counter())
+                file_lines_by_authors = lines_by_authors_by_file.setdefault(path, Counter())
+                removed = self._remove_lines_proportionally(file_lines_by_authors, deleted)
+                lines_by_authors.subtract(removed)
+                file_lines_by_authors[author] += added
+                lines_by_authors[author] += added
+                if not file_lines_by_authors :
+                    del lines_by_authors_by_file[path]
+            # drop authors without lines left
+            yield (timestamp, +lines_by_authors)
+
+    @staticmethod
+    def _remove_lines_proportionally(lines_by_authors, num_lines) :
+        # Removes num_lines lines from lines_by_authors in proportion to each author's
+        # lines, largest remainders first, and returns the lines removed by author.
+        total_lines = sum(lines_by_authors.values())
+        if num_lines >= total_lines :
+            removed = Counter(lines_by_authors)
+            lines_by_authors.clear()
+            return removed
+        removed = Counter()
+        remainders = []
+        for author, lines in lines_by_authors.items() :
+            quotient, remainder = divmod(lines * num_lines, total_lines)
+            removed[author] = quotient
+            remainders.append((remainder, lines, author))
+        remainders.sort(reverse=True)
+        for _, _, author in remainders[:num_lines - sum(removed.values())] :
+            removed[author] += 1
+        lines_by_authors.subtract(removed)
+        for author in [author for author, lines in lines_by_authors.items() if not lines] :
+            del lines_by_authors[author]
+        return removed
 
-    def _update_files_by_stamp(self, repository, time_files_commit) :
+    @staticmethod
+    def _parse_numstat(lines) :
+        # Outputs:
+        # \x1e<stamp>\x1f<author>
+        # <added>\t<deleted>\t<path>, or "-\t-\t<path>" for binary files
+        # Yields (stamp, author, [(added, deleted, old path, path)]).
+        commit = None
+        numstat = None
+        for line in lines :
+            if line.startswith('\x1e') :
+                if commit is not None :
+                    yield commit
+                timestamp, author = line[1:].split('\x1f', 1)
+                numstat = []
+                commit = (timestamp, author, numstat)
+            elif line and numstat is not None :
+                added, deleted, path = line.split('\t', 2)
+                old_path, path = GitFilesStatistics._split_renamed_path(path)
+                numstat.append((
+                    int(added) if added != '-' else 0,
+                    int(deleted) if deleted != '-' else 0,
+                    old_path, path))
+        if commit is not None :
+            yield commit
+
+    @staticmethod
+    def _split_renamed_path(path) :
+        # Renames are shown as "old => new" or with the common parts outside of braces,
+        # e.g. "lib/{old => new}/file" or "{ => lib}/file".
+        if ' => ' not in path :
+            path = unquote_path(path)
+            return (path, path)
+        brace_start = path.find('{')
+        brace_end = path.find('}', brace_start)
+        if brace_start == -1 or brace_end == -1 :
+            old_path, path = path.split(' => ', 1)
+            return (unquote_path(old_path), unquote_path(path))
+        prefix, suffix = path[:brace_start], path[brace_end+1:]
+        old_part, new_part = path[brace_start+1:brace_end].split(' => ', 1)
+        old_path = (prefix + old_part + suffix).replace('//', '/').lstrip('/')
+        path = (prefix + new_part + suffix).replace('//', '/').lstrip('/')
+        return (old_path, path)
+
+    def _use_first_parent_diffs(self) :
+        # raw diff streams need --diff-merges=first-parent
+        return self.get_git_version_tuple() >= (2, 31)
+
+    def _num_files_by_revlist(self, lines, log_range, prefix_path) :
+        # Lines are "<stamp> <tree> <commit hash>". The number of files of a commit is
+        # the number of files of its first parent plus the files added minus the files
+        # deleted by the commit, all taken from one raw diff stream over log_range.
+        # Only first parents outside of the stream are counted with `git ls-tree -r`.
+        cmd = ['git', 'log', '--reverse', '--raw', '--no-renames', '--diff-merges=first-parent',
+               '--pretty=format:%x1e%H %P', *log_range, *prefix_path]
+        num_files_by_commit = {}
+        for commit_hash, first_parent, changes in self._parse_raw_diff(get_command_lines(cmd)) :
+            if first_parent is None :
+                num_files = 0
+            else :
+                num_files = self._get_num_files(num_files_by_commit, first_parent, prefix_path)
+            # mode 000000 stands for a missing file and submodules (160000) are no files
+            for old_mode, new_mode, _ in changes :
+                num_files += (new_mode not in ('000000', '160000')) - \
+                    (old_mode not in ('000000', '160000'))
+            num_files_by_commit[commit_hash] = num_files
+        time_num_files = []
+        for line in lines :
+            timestamp, _, commit_hash = line.split()
+            time_num_files.append(
+                (timestamp, self._get_num_files(num_files_by_commit, commit_hash, prefix_path)))
+        return time_num_files
+
+    @staticmethod
+    def _get_num_files(num_files_by_commit, commit_hash, prefix_path) :
+        if commit_hash not in num_files_by_commit :
+            pipe_out = get_command_output(['git', 'ls-tree', '-r', commit_hash, *prefix_path])
+            num_files_by_commit[commit_hash] = \
+                len(GitStatisticsParallel.file_tree_by_revision(pipe_out))
+        return num_files_by_commit[commit_hash]
+
+    @staticmethod
+    def _parse_raw_diff(lines) :
+        # Outputs:
+        # \x1e<commit hash> <parents>
+        # :<old mode> <new mode> <old blob> <new blob> <status>\t<path>
+        # Yields (commit hash, first parent or None, [(old mode, new mode, path), ...])
+        commit_hash = None
+        for line in lines :
+            if line.startswith('\x1e') :
+                if commit_hash is not None :
+                    yield (commit_hash, first_parent, changes)
+                commit_hash, *parents = line[1:].split()
+                first_parent = parents[0] if parents else None
+                changes = []
+            elif line.startswith(':') :
+                info, path = line[1:].split('\t', 1)
+                old_mode, new_mode, _ = info.split(' ', 2)
+                changes.append((old_mode, new_mode, unquote_path(path)))
+        if commit_hash is not None :
+            yield (commit_hash, first_parent, changes)
+
+    def _update_files_by_stamp(self, repository, time_num_files) :
+        repository_id = self.get_repository_id(repository)
         prev_num_files = 0
-        for timestamp, file_tree, _ in time_files_commit :
-            # meld stamp and repository into a single key for self.files_by_stamp
-            stamp_key = ' '.join([timestamp, repository])
-            num_files = len(file_tree)
-            if stamp_key not in self.files_by_stamp :
-                self.files_by_stamp[stamp_key] = {}
-            self.files_by_stamp[stamp_key]['files'] = num_files
-            self.files_by_stamp[stamp_key]['delta_files'] = num_files - prev_num_files
+        for timestamp, num_files in time_num_files :
+            self.files_by_stamp.append(
+                int(timestamp), repository_id, num_files, num_files - prev_num_files)
             prev_num_files = num_files
 
-    def _lines_by_authors_by_stamp(self, time_files_commit) :
-        lines_by_authors = GitStatisticsParallel.lines_by_authors
-        return [(timestamp, lines_by_authors(
-            file_tree, commit_hash, self.configuration['processes']))
-                for timestamp, file_tree, commit_hash in time_files_commit]
+    def _lines_by_authors_by_stamp(self, repository, time_files_commit, log_range) :
+        # The first revision is blamed in full. A later revision only blames the files it
+        # changed against its first parent and takes the author counts of all other files
+        # over from the first parent, where git blame would pass them anyway.
+        # With lines_by_date_sampling only the sampled revisions get author counts, the
+        # others None.
+        samples = self._sample_revisions(time_files_commit)
+        if not self._use_first_parent_diffs() :
+            return self._blamed_lines_by_authors_by_stamp(repository, time_files_commit, samples)
+        cmd = ['git', 'log', '--reverse', '--raw', '--no-renames', '--diff-merges=first-parent',
+               '--pretty=format:%x1e%H %P', *log_range, *repository.prefix_path]
+        changes_by_commit = {
+            commit_hash : (first_parent, {path for _, _, path in changes})
+            for commit_hash, first_parent, changes in self._parse_raw_diff(get_command_lines(cmd))}
+        if samples is not None :
+            return self._sampled_lines_by_authors_by_stamp(
+                repository, time_files_commit, changes_by_commit, samples)
+        blame_steps = self._get_blame_steps(time_files_commit, changes_by_commit)
+        lines_by_authors_by_file = GitStatisticsParallel.lines_by_authors_by_file(
+            [commit_file for *_, blamed in blame_steps for commit_file in blamed],
+            self.configuration['processes'])
+        return self._fold_blame_steps(blame_steps, lines_by_authors_by_file)
+
+    def _blamed_lines_by_authors_by_stamp(self, repository, time_files_commit, samples) :
+        # without first parent diffs every (sampled) revision is blamed in full
+        if samples is not None :
+            self._set_lines_by_date_sampling(
+                repository.name, time_files_commit, samples,
+                sum(len(file_tree) for _, file_tree, _ in time_files_commit),
+                sum(len(time_files_commit[i][1]) for i in samples))
+        lines_by_authors_by_commit = GitStatisticsParallel.lines_by_authors_by_commit(
+            [(commit_hash, file_tree)
+             for i, (_, file_tree, commit_hash) in enumerate(time_files_commit)
+             if samples is None or i in samples],
+            self.configuration['processes'])
+        return [(timestamp, lines_by_authors_by_commit.get(commit_hash))
+                for timestamp, _, commit_hash in time_files_commit]
+
+    @staticmethod
+    def _fold_blame_steps(blame_steps, lines_by_authors_by_file) :
+        # The author counts of a revision are the ones of its base revision without the
+        # files it dropped and with the files it blamed. The counts of a base revision
+        # are kept until its last revision based on it.
+        pending_bases = Counter(base for _, _, base, _, _ in blame_steps if base)
+        lines_by_authors_by_commit = {}
+        lines_by_authors_by_stamp = []
+        for timestamp, commit_hash, base, dropped, blamed in blame_steps :
+            if base is None :
+                lines_by_authors = Counter()
+            else :
+                lines_by_authors = lines_by_authors_by_commit[base].copy()
+                pending_bases[base] -= 1
+                if not pending_bases[base] :
+                    del lines_by_authors_by_commit[base]
+                for commit_file in dropped :
+                    lines_by_authors.subtract(lines_by_authors_by_file[commit_file])
+            for commit_file in blamed :
+                lines_by_authors.update(lines_by_authors_by_file[commit_file])
+            # drop authors without lines left
+            lines_by_authors = +lines_by_authors
+            if pending_bases[commit_hash] :
+                lines_by_authors_by_commit[commit_hash] = lines_by_authors
+            lines_by_authors_by_stamp.append((timestamp, lines_by_authors))
+        return lines_by_authors_by_stamp
+
+    def _sampled_lines_by_authors_by_stamp(
+            self, repository, time_files_commit, changes_by_commit, samples) :
+        # only the file versions present in a sampled revision are blamed
+        blames_by_sample, total_blames = self._get_sampled_blames(
+            time_files_commit, changes_by_commit, samples)
+        commit_files = list(dict.fromkeys(
+            commit_file for blames in blames_by_sample.values() for commit_file in blames))
+        self._set_lines_by_date_sampling(
+            repository.name, time_files_commit, samples, total_blames, len(commit_files))
+        lines_by_authors_by_file = GitStatisticsParallel.lines_by_authors_by_file(
+            commit_files, self.configuration['processes'])
+        lines_by_authors_by_stamp = []
+        for i, (timestamp, _, _) in enumerate(time_files_commit) :
+            if i in blames_by_sample :
+                lines_by_authors = Counter()
+                for commit_file in blames_by_sample[i] :
+                    lines_by_authors.update(lines_by_authors_by_file[commit_file])
+            else :
+                lines_by_authors = None
+            lines_by_authors_by_stamp.append((timestamp, lines_by_authors))
+        return lines_by_authors_by_stamp
+
+    @staticmethod
+    def _get_sampled_blames(time_files_commit, changes_by_commit, samples) :
+        # The file versions to blame for each sampled revision and the number of blames
+        # of a run without sampling
+        blames_by_sample = {}
+        total_blames = 0
+        for i, (_, _, _, _, blames, blamed) in enumerate(
+                GitFilesStatistics._walk_blames(time_files_commit, changes_by_commit)) :
+            total_blames += len(blamed)
+            if i in samples :
+                blames_by_sample[i] = list(blames.values())
+        return blames_by_sample, total_blames
+
+    def _sample_revisions(self, time_files_commit) :
+        # Indices of the revisions sampled by lines_by_date_sampling, which is 'week' or
+        # 'month' for the last revision of each, or a number of evenly spaced revisions.
+        # None without sampling.
+        sampling = str(self.configuration['lines_by_date_sampling'])
+        if not sampling or not time_files_commit :
+            return None
+        if sampling.isdigit() :
+            num_samples = max(1, min(int(sampling), len(time_files_commit)))
+            if num_samples == 1 :
+                return {len(time_files_commit) - 1}
+            return {round(i * (len(time_files_commit) - 1) / (num_samples - 1))
+                    for i in range(num_samples)}
+        if sampling == 'week' :
+            def get_period(date) :
+                return date.isocalendar()[:2]
+        elif sampling == 'month' :
+            def get_period(date) :
+                return (date.year, date.month)
+        else :
+            raise ValueError(f"Unknown lines_by_date_sampling \"{sampling}\"")
+        last_in_period = {}
+        for i, (timestamp, _, _) in enumerate(time_files_commit) :
+            last_in_period[get_period(datetime.datetime.fromtimestamp(int(timestamp)))] = i
+        return set(last_in_period.values())
+
+    def _set_lines_by_date_sampling(
+            self, repository, time_files_commit, samples, total_blames, sampled_blames) :
+        self.lines_by_date_sampling[repository] = {
+            'sampling' : str(self.configuration['lines_by_date_sampling']),
+            'revisions' : len(time_files_commit),
+            'stamps' : [time_files_commit[i][0] for i in sorted(samples)],
+            'blames' : sampled_blames,
+            'total_blames' : total_blames }
+        print(f"Sampled {len(samples)} of {len(time_files_commit)} revisions for lines by \
+author, {sampled_blames} of {total_blames} blames")
+
+    @staticmethod
+    def _get_blame_steps(time_files_commit, changes_by_commit) :
+        # (stamp, commit hash, base revision or None, dropped blames, new blames) of each
+        # revision relative to the blames of its base revision, the first parent
+        blame_steps = []
+        for timestamp, commit_hash, base, parent_blames, blames, blamed in \
+                GitFilesStatistics._walk_blames(time_files_commit, changes_by_commit) :
+            if base is None :
+                blame_steps.append((timestamp, commit_hash, None, [], blamed))
+            else :
+                dropped = [commit_file for path, commit_file in parent_blames.items()
+                           if blames.get(path) is not commit_file]
+                blame_steps.append((timestamp, commit_hash, base, dropped, blamed))
+        return blame_steps
+
+    @staticmethod
+    def _walk_blames(time_files_commit, changes_by_commit) :
+        # For every revision the (commit hash, path) blame each of its files is taken from,
+        # yields (stamp, commit hash, base revision or None, blames of the base revision,
+        # blames by path, new blames).
+        pending_children = Counter(
+            changes_by_commit[commit_hash][0] for *_, commit_hash in time_files_commit
+            if commit_hash in changes_by_commit)
+        blames_by_commit = {}
+        for timestamp, file_tree, commit_hash in time_files_commit :
+            first_parent, changed_paths = changes_by_commit.get(commit_hash, (None, set()))
+            parent_blames = blames_by_commit.get(first_parent)
+            blames = {}
+            blamed = []
+            for path in file_tree :
+                commit_file = parent_blames.get(path) if parent_blames is not None else None
+                if commit_file is None or path in changed_paths :
+                    commit_file = (commit_hash, path)
+                    blamed.append(commit_file)
+                blames[path] = commit_file
+            if parent_blames is None :
+                yield (timestamp, commit_hash, None, None, blames, blamed)
+            else :
+                yield (timestamp, commit_hash, first_parent, parent_blames, blames, blamed)
+                pending_children[first_parent] -= 1
+                if not pending_children[first_parent] :
+                    del blames_by_commit[first_parent]
+            if pending_children[commit_hash] :
+                blames_by_commit[commit_hash] = blames
 
     def _update_lines_by_date_by_author(self, repository, lines_by_authors_by_stamp) :
-        prev_lines_by_authors = Counter()
+        # Only the authors whose lines changed are kept per stamp, as rows of author id
+        # and delta lines. The cumulative lines are rebuilt from the deltas when they are
+        # written. The author counts come by name, as blamed or read from the caches.
+        delta_lines_by_authors_by_stamp, _ = self._get_delta_lines_by_authors(
+            lines_by_authors_by_stamp, Counter())
+        self._add_delta_lines_by_date_by_author(repository, delta_lines_by_authors_by_stamp)
+
+    @staticmethod
+    def _get_delta_lines_by_authors(lines_by_authors_by_stamp, prev_lines_by_authors) :
+        # Returns (stamp, ((author, delta lines), ...) or None if not sampled) against the
+        # previous sampled stamp, starting with prev_lines_by_authors, and the lines by
+        # author of the last sampled stamp.
+        delta_lines_by_authors_by_stamp = []
         for timestamp, lines_by_authors in lines_by_authors_by_stamp :
-            # meld stamp and repository into a single key for self.files_by_stamp
-            stamp_key = ' '.join([timestamp, repository])
-            self.lines_by_date_by_author[stamp_key] = {}
-            lines_by_date_by_author = self.lines_by_date_by_author[stamp_key]
-            prev_authors = set(prev_lines_by_authors.keys())
-            authors = set(lines_by_authors.keys())
-            for author in authors.union(prev_authors) :
-                lines_by_date_by_author[author] = {}
-            for author in prev_authors.difference(authors) :
-                lines_by_date_by_author[author]['lines'] = 0
-                lines_by_date_by_author[author]['delta_lines'] = -prev_lines_by_authors[author]
-            for author in authors.intersection(prev_authors) :
-                lines_by_date_by_author[author]['lines'] = lines_by_authors[author]
-                lines_by_date_by_author[author]['delta_lines'] = \
-                    lines_by_authors[author] - prev_lines_by_authors[author]
-            for author in authors.difference(prev_authors) :
-                lines_by_date_by_author[author]['lines'] = lines_by_authors[author]
-                lines_by_date_by_author[author]['delta_lines'] = lines_by_authors[author]
+            if lines_by_authors is None :
+                delta_lines_by_authors_by_stamp.append((timestamp, None))
+                continue
+            delta_lines_by_author = [
+                (sys.intern(author), lines - prev_lines_by_authors.get(author, 0))
+                for author, lines in lines_by_authors.items()
+                if lines != prev_lines_by_authors.get(author, 0)]
+            delta_lines_by_author.extend(
+                (author, -lines) for author, lines in prev_lines_by_authors.items()
+                if author not in lines_by_authors and lines)
+            delta_lines_by_authors_by_stamp.append((timestamp, tuple(delta_lines_by_author)))
             prev_lines_by_authors = lines_by_authors
+        return (delta_lines_by_authors_by_stamp, prev_lines_by_authors)
+
+    def _add_delta_lines_by_date_by_author(self, repository, delta_lines_by_authors_by_stamp) :
+        get_id = self.author_registry.get_id
+        repository_id = self.get_repository_id(repository)
+        for timestamp, delta_lines_by_author in delta_lines_by_authors_by_stamp :
+            if delta_lines_by_author is None :
+                # not sampled
+                continue
+            stamp = int(timestamp)
+            for author, delta_lines in delta_lines_by_author or [(None, 0)] :
+                self.lines_by_date_by_author.append(
+                    stamp, repository_id, -1 if author is None else get_id(author), delta_lines)
 
 # ****************************************************************************************
 # ****************************************************************************************
 
+class ActiveDays :
+    # Set of days kept as a bitmap of day indices. Bit i stands for the day with the
+    # ordinal first_day + i, so a union is one shift and one or of two integers and the
+    # number of days is the number of set bits.
+    __slots__ = ('first_day', 'bits')
+
+    def __init__(self, days=()) :
+        self.first_day = 0
+        self.bits = 0
+        self.add_days(days)
+
+    def add(self, day) :
+        self.add_days((day,))
+
+    def add_days(self, days) :
+        # days as ordinals, e.g. date.toordinal()
+        first_day = self.first_day
+        bits = self.bits
+        for day in days :
+            if not bits :
+                first_day = day
+            elif day < first_day :
+                bits <<= first_day - day
+                first_day = day
+            bits |= 1 << (day - first_day)
+        self.first_day = first_day
+        self.bits = bits
+
+    def update(self, other) :
+        if not other.bits :
+            return
+        if not self.bits :
+            self.first_day = other.first_day
+            self.bits = other.bits
+        elif other.first_day < self.first_day :
+            self.bits = (self.bits << (self.first_day - other.first_day)) | other.bits
+            self.first_day = other.first_day
+        else :
+            self.bits |= other.bits << (other.first_day - self.first_day)
+
+    def copy(self) :
+        active_days = ActiveDays()
+        active_days.first_day = self.first_day
+        active_days.bits = self.bits
+        return active_days
+
+    def __len__(self) :
+        return bin(self.bits).count('1')
+
+    def __iter__(self) :
+        bits = self.bits
+        day = self.first_day
+        while bits :
+            if bits & 1 :
+                yield datetime.date.fromordinal(day)
+            bits >>= 1
+            day += 1
+
+    def __eq__(self, other) :
+        # the lowest bit is always set, so equal sets have equal fields
+        if not isinstance(other, ActiveDays) :
+            return NotImplemented
+        return self.bits == other.bits and (not self.bits or self.first_day == other.first_day)
+
+    __hash__ = None
+
+    def __repr__(self) :
+        return f"ActiveDays({[day.isoformat() for day in self]})"
+
 class GitContributionActivity(GitStatisticsBase) :
     def __init__(self, conf, gitpaths) :
         super().__init__(conf, gitpaths)
@@ -721,7 +1925,7 @@ class GitContributionActivity(GitStatisticsBase) :
         self.author_of_year = {}
         self.commits_by_year = {}
         self.first_active_day = None
-        self.active_days = set()
+        self.active_days = ActiveDays()
         self.commits_by_timezone = {}
 
     def get_first_commit_date(self) :
@@ -790,35 +1994,249 @@ class GitContributionActivity(GitStatisticsBase) :
             self.configuration['project_name'] = ', '.join(project_names)
 
     def _collect_commits_graph(self, repository) :
-        log_range = self.get_log_range('HEAD')
+        log_range = self.get_log_range_args('HEAD')
         prefix_path = repository.prefix_path
         # Outputs "<stamp> <date> <time> <timezone> <author> '<' <mail> '>'"
-        cmd = f"git rev-list --pretty=format:\"%at %ai %aN <%aE>\" {log_range} {prefix_path}"
-        pipe_out = get_pipe_output([cmd, 'grep -v ^commit'])
-        lines = pipe_out.split('\n')
-        self.total_commits += len(lines)
-        for line in lines :
+        cmd = ['git', 'rev-list', '--pretty=format:%at %ai %aN <%aE>', *log_range, *prefix_path]
+        if self.configuration['spooled_output'] :
+            with get_command_buffer(cmd) as output :
+                self._update_commit_activities(*self._parse_revlist_commits(output))
+            return
+        stamps, timezones, authors, mails = [], [], [], []
+        for line in skip_commit_lines(get_command_lines(cmd)) :
             parts = line.split(' ', 4)
             author = ''
-            stamp = int(parts[0])
-            date = datetime.datetime.fromtimestamp(stamp)
-            timezone = parts[3]
+            stamps.append(int(parts[0]))
+            timezones.append(parts[3])
             author, mail = parts[4].split('<', 1)
-            author = author.rstrip()
-            mail = mail.rstrip('>')
-            domain = '?'
-            if mail.find('@') != -1 :
-                domain = mail.rsplit('@', 1)[1]
-
-            self._update_extremal_commit_stamps(stamp)
-            self._update_mail_domains(domain)
-            self._update_activity(date)
-            self._update_author_stats(author, stamp)
-            self._update_author_activity(author, date)
-            self._update_commits_by_month(author, date)
-            self._update_commits_by_year(author, date)
-            self._update_active_days(date)
-            self._update_timezones(timezone)
+            authors.append(author.rstrip())
+            mails.append(mail.rstrip('>'))
+        self._update_commit_activities(
+            stamps, timezones, self.author_registry.get_ids(authors), mails)
+
+    def _parse_revlist_commits(self, output) :
+        # Returns the columns of _update_commit_activities from the bytes of the output.
+        # Timezones and authors with their mails repeat, each is decoded once.
+        decoded = {}
+        stamps, timezones, authors, mails = [], [], [], []
+        for stamp, timezone, person in _revlist_commit_record.findall(output) :
+            stamps.append(int(stamp))
+            if timezone not in decoded :
+                decoded[timezone] = timezone.decode('ascii', errors='replace')
+            timezones.append(decoded[timezone])
+            if person not in decoded :
+                author, mail = person.decode('utf8', errors='replace').split('<', 1)
+                decoded[person] = (self.author_registry.get_id(author.rstrip()), mail.rstrip('>'))
+            author, mail = decoded[person]
+            authors.append(author)
+            mails.append(mail)
+        return (stamps, timezones, authors, mails)
+
+    def _update_commit_activities(self, stamps, timezones, authors, mails) :
+        # The commits are given column by column in the order of the walk, the authors by
+        # id. With NumPy the histograms are counted over whole arrays instead of commit
+        # by commit, with the authors of the repository renumbered from 0.
+        if np is None or not stamps :
+            for stamp, timezone, author, mail in zip(stamps, timezones, authors, mails) :
+                self._update_commit_activity(stamp, timezone, author, mail)
+            return
+        index_of_author = {author : i for i, author in enumerate(dict.fromkeys(authors))}
+        author_by_commit = np.fromiter(
+            map(index_of_author.__getitem__, authors), dtype=np.int64, count=len(authors))
+        authors = list(index_of_author)
+        stamps = np.fromiter(stamps, dtype=np.int64, count=len(stamps))
+        self.total_commits += len(stamps)
+        self._update_extremal_commit_stamps(int(stamps.max()))
+        self._update_extremal_commit_stamps(int(stamps.min()))
+        self._update_mail_domains_of_commits(mails)
+        commit_dates = self._get_commit_dates(stamps)
+        self._update_activity_of_commits(commit_dates)
+        self._update_author_stats_of_commits(authors, author_by_commit, stamps, commit_dates)
+        self._update_author_tables_of_commits(authors, author_by_commit, commit_dates)
+        self._update_active_days_of_commits(commit_dates)
+        self._update_timezones_of_commits(timezones)
+
+    def _update_timezones_of_commits(self, timezones) :
+        for timezone, commits_of_timezone in Counter(timezones).items() :
+            self.commits_by_timezone[timezone] = \
+                self.commits_by_timezone.get(timezone, 0) + commits_of_timezone
+
+    def _update_mail_domains_of_commits(self, mails) :
+        for mail, commits_of_mail in Counter(mails).items() :
+            domain = mail.rsplit('@', 1)[1] if mail.find('@') != -1 else '?'
+            if domain not in self.domains :
+                self.domains[domain] = {}
+            self.domains[domain]['commits'] = \
+                self.domains[domain].get('commits', 0) + commits_of_mail
+
+    @classmethod
+    def _get_commit_dates(cls, stamps) :
+        # the local calendar fields of the commits as arrays, days since 1970-01-01
+        local_seconds = cls._local_seconds(stamps)
+        days = local_seconds // 86400
+        hours = (local_seconds - days * 86400) // 3600
+        # 1970-01-01 was a Thursday, weekday 3
+        weekdays = (days + 3) % 7
+        dates = days.astype('datetime64[D]')
+        years = dates.astype('datetime64[Y]')
+        year_days = days - years.astype('datetime64[D]').astype(np.int64)
+        return CommitDatesTuple(
+            days, hours, weekdays,
+            months=dates.astype('datetime64[M]').astype(np.int64),
+            years=years.astype(np.int64),
+            # week of the year with Monday as first day, as '%W'
+            weeks=(year_days + 7 - weekdays) // 7,
+            unique_days=np.unique(days))
+
+    def _update_activity_of_commits(self, commit_dates) :
+        # the histograms by hour, day of week, hour of week, month of year and year week
+        counts = self._count_first_seen
+        for hour, commits_of_hour in counts(commit_dates.hours) :
+            self.activity_by_hour_of_day[hour] = \
+                self.activity_by_hour_of_day.get(hour, 0) + commits_of_hour
+        self.activity_by_hour_of_day_busiest = max(
+            self.activity_by_hour_of_day_busiest, *self.activity_by_hour_of_day.values())
+        for day, commits_of_day in counts(commit_dates.weekdays) :
+            self.activity_by_day_of_week[day] = \
+                self.activity_by_day_of_week.get(day, 0) + commits_of_day
+        for hour_of_week, commits_of_hour in counts(
+                commit_dates.weekdays * 24 + commit_dates.hours) :
+            day, hour = divmod(hour_of_week, 24)
+            activity_of_day = self.activity_by_hour_of_week.setdefault(day, {})
+            activity_of_day[hour] = activity_of_day.get(hour, 0) + commits_of_hour
+            self.activity_by_hour_of_week_busiest = max(
+                self.activity_by_hour_of_week_busiest, activity_of_day[hour])
+        for month, commits_of_month in counts(commit_dates.months % 12 + 1) :
+            self.activity_by_month_of_year[month] = \
+                self.activity_by_month_of_year.get(month, 0) + commits_of_month
+        for year_week, commits_of_week in counts(
+                (commit_dates.years + 1970) * 100 + commit_dates.weeks) :
+            yyw = f"{year_week // 100:04d}-{year_week % 100:02d}"
+            self.activity_by_year_week[yyw] = \
+                self.activity_by_year_week.get(yyw, 0) + commits_of_week
+            self.activity_by_year_week_peak = max(
+                self.activity_by_year_week_peak, self.activity_by_year_week[yyw])
+
+    def _update_author_stats_of_commits(self, authors, author_by_commit, stamps, commit_dates) :
+        # first and last commit, first active day and active days of each author
+        first_stamps = np.full(len(authors), np.iinfo(np.int64).max)
+        np.minimum.at(first_stamps, author_by_commit, stamps)
+        last_stamps = np.full(len(authors), np.iinfo(np.int64).min)
+        np.maximum.at(last_stamps, author_by_commit, stamps)
+        first_days = np.full(len(authors), np.iinfo(np.int64).max)
+        np.minimum.at(first_days, author_by_commit, commit_dates.days)
+        first_active_days = np.datetime_as_string(first_days.astype('datetime64[D]')).tolist()
+        ordinal_of_author_days, bounds = self._active_days_by_author(
+            len(authors), author_by_commit, commit_dates)
+        for author_id, author in enumerate(authors) :
+            self._update_author_stats(author, int(last_stamps[author_id]))
+            self._update_author_stats(author, int(first_stamps[author_id]))
+            stats = self._authors_of_repository[author]
+            if stats.first_active_day is None or \
+               first_active_days[author_id] < stats.first_active_day :
+                stats.first_active_day = first_active_days[author_id]
+            stats.active_days.add_days(
+                ordinal_of_author_days[bounds[author_id]:bounds[author_id + 1]])
+
+    @staticmethod
+    def _active_days_by_author(num_authors, author_by_commit, commit_dates) :
+        # The ordinals of the distinct (author, day) pairs grouped by author and the
+        # bounds of the group of each author.
+        unique_days = commit_dates.unique_days
+        author_days = np.unique(
+            author_by_commit * len(unique_days) +
+            np.searchsorted(unique_days, commit_dates.days))
+        author_of_author_days, day_of_author_days = np.divmod(author_days, len(unique_days))
+        # ordinal of 1970-01-01
+        ordinal_of_author_days = (unique_days[day_of_author_days] + 719163).tolist()
+        bounds = np.searchsorted(author_of_author_days, np.arange(num_authors + 1))
+        return (ordinal_of_author_days, bounds)
+
+    def _update_author_tables_of_commits(self, authors, author_by_commit, commit_dates) :
+        # commits by month and year, in total and by author
+        self._update_commits_by_month_of_commits(authors, author_by_commit, commit_dates)
+        self._update_commits_by_year_of_commits(authors, author_by_commit, commit_dates)
+
+    def _update_commits_by_month_of_commits(self, authors, author_by_commit, commit_dates) :
+        num_authors = len(authors)
+        for author_month, commits_of_month in self._count_first_seen(
+                author_by_commit + commit_dates.months * num_authors) :
+            month, author_id = divmod(author_month, num_authors)
+            yymm = f"{month // 12 + 1970:04d}-{month % 12 + 1:02d}"
+            author_of_month = self.author_of_month.setdefault(yymm, {})
+            author_of_month[authors[author_id]] = \
+                author_of_month.get(authors[author_id], 0) + commits_of_month
+            self.commits_by_month[yymm] = self.commits_by_month.get(yymm, 0) + commits_of_month
+
+    def _update_commits_by_year_of_commits(self, authors, author_by_commit, commit_dates) :
+        num_authors = len(authors)
+        for author_year, commits_of_year in self._count_first_seen(
+                author_by_commit + commit_dates.years * num_authors) :
+            year, author_id = divmod(author_year, num_authors)
+            year += 1970
+            author_of_year = self.author_of_year.setdefault(year, {})
+            author_of_year[authors[author_id]] = \
+                author_of_year.get(authors[author_id], 0) + commits_of_year
+            self.commits_by_year[year] = self.commits_by_year.get(year, 0) + commits_of_year
+
+    def _update_active_days_of_commits(self, commit_dates) :
+        unique_days = commit_dates.unique_days
+        first_active_day = str(unique_days[:1].astype('datetime64[D]')[0])
+        if self.first_active_day is None or first_active_day < self.first_active_day :
+            self.first_active_day = first_active_day
+        # ordinal of 1970-01-01
+        self.active_days.add_days((unique_days + 719163).tolist())
+
+    @staticmethod
+    def _count_first_seen(keys) :
+        # (key, count) of the distinct keys in the order they first appear
+        min_key = int(keys.min())
+        num_keys = int(keys.max()) - min_key + 1
+        if num_keys > 4 * len(keys) :
+            unique_keys, first_seen, counts = np.unique(
+                keys, return_index=True, return_counts=True)
+            order = np.argsort(first_seen, kind='stable')
+            return zip(unique_keys[order].tolist(), counts[order].tolist())
+        # keys from a compact range are counted in place, the first position of each key
+        # is the one written last when assigning the positions backwards
+        keys = keys - min_key
+        counts = np.bincount(keys, minlength=num_keys)
+        first_seen = np.empty(num_keys, dtype=np.int64)
+        first_seen[keys[::-1]] = np.arange(len(keys) - 1, -1, -1)
+        present = np.flatnonzero(counts)
+        present = present[np.argsort(first_seen[present], kind='stable')]
+        return zip((present + min_key).tolist(), counts[present].tolist())
+
+    @staticmethod
+    def _local_seconds(stamps) :
+        # Stamps shifted into local time like datetime.fromtimestamp does. The offset is
+        # looked up once per day, commits on a day with a change of offset one by one.
+        def local_offset(stamp) :
+            return calendar.timegm(time.localtime(stamp)) - stamp
+        utc_days, day_of_commit = np.unique(stamps // 86400, return_inverse=True)
+        offsets_at_start = np.array([local_offset(int(day) * 86400) for day in utc_days])
+        offsets_at_end = np.array([local_offset(int(day) * 86400 + 86399) for day in utc_days])
+        offsets = offsets_at_start[day_of_commit]
+        for i in np.flatnonzero((offsets_at_start != offsets_at_end)[day_of_commit]) :
+            offsets[i] = local_offset(int(stamps[i]))
+        return stamps + offsets
+
+    def _update_commit_activity(self, stamp, timezone, author, mail) :
+        self.total_commits += 1
+        date = datetime.datetime.fromtimestamp(stamp)
+        domain = '?'
+        if mail.find('@') != -1 :
+            domain = mail.rsplit('@', 1)[1]
+
+        self._update_extremal_commit_stamps(stamp)
+        self._update_mail_domains(domain)
+        self._update_activity(date)
+        self._update_author_stats(author, stamp)
+        self._update_author_activity(author, date)
+        self._update_commits_by_month(author, date)
+        self._update_commits_by_year(author, date)
+        self._update_active_days(date)
+        self._update_timezones(timezone)
 
     def _update_extremal_commit_stamps(self, stamp) :
         if stamp > self.last_commit_stamp :
@@ -855,28 +2273,20 @@ class GitContributionActivity(GitStatisticsBase) :
             self.activity_by_year_week_peak = self.activity_by_year_week[yyw]
 
     def _update_author_stats(self, author, stamp) :
-        if author not in self._authors_of_repository :
-            self._authors_of_repository[author] = {}
+        stats = self._get_author_stats(author)
         # commits, note again that commits may be in any date order
         # because of cherry-picking and patches
-        if 'last_commit_stamp' not in self._authors_of_repository[author] :
-            self._authors_of_repository[author]['last_commit_stamp'] = stamp
-        if stamp > self._authors_of_repository[author]['last_commit_stamp'] :
-            self._authors_of_repository[author]['last_commit_stamp'] = stamp
-        if 'first_commit_stamp' not in self._authors_of_repository[author] :
-            self._authors_of_repository[author]['first_commit_stamp'] = stamp
-        if stamp < self._authors_of_repository[author]['first_commit_stamp'] :
-            self._authors_of_repository[author]['first_commit_stamp'] = stamp
+        if stats.last_commit_stamp is None or stamp > stats.last_commit_stamp :
+            stats.last_commit_stamp = stamp
+        if stats.first_commit_stamp is None or stamp < stats.first_commit_stamp :
+            stats.first_commit_stamp = stamp
 
     def _update_author_activity(self, author, date) :
+        stats = self._authors_of_repository[author]
         yymmdd = date.strftime('%Y-%m-%d')
-        if 'first_active_day' not in self._authors_of_repository[author] :
-            self._authors_of_repository[author]['first_active_day'] = yymmdd
-        if yymmdd < self._authors_of_repository[author]['first_active_day'] :
-            self._authors_of_repository[author]['first_active_day'] = yymmdd
-        if 'active_days' not in self._authors_of_repository[author] :
-            self._authors_of_repository[author]['active_days'] = set([yymmdd])
-        self._authors_of_repository[author]['active_days'].add(yymmdd)
+        if stats.first_active_day is None or yymmdd < stats.first_active_day :
+            stats.first_active_day = yymmdd
+        stats.active_days.add(date.toordinal())
 
     def _update_commits_by_month(self, author, date) :
         yymm = date.strftime('%Y-%m')
@@ -902,7 +2312,7 @@ class GitContributionActivity(GitStatisticsBase) :
             self.first_active_day = yymmdd
         if yymmdd < self.first_active_day :
             self.first_active_day = yymmdd
-        self.active_days.add(yymmdd)
+        self.active_days.add(date.toordinal())
 
     def _update_timezones(self, timezone) :
         self.commits_by_timezone[timezone] = self.commits_by_timezone.get(timezone, 0) + 1
@@ -918,6 +2328,7 @@ class GitStatisticsData(LogShortStatData,
         super().__init__(conf, gitpaths)
         self.total_authors = set()
         self.authors = {}
+        self._index_dir = None
 
     def get_total_authors(self) :
         return self.total_authors
@@ -925,11 +2336,18 @@ class GitStatisticsData(LogShortStatData,
     def get_authors(self, limit=None) :
         authors_by_commits = [
             author for author, _ in
-            sorted(self.authors.items(), key=lambda el : el[1]['commits'], reverse=True)]
+            sorted(self.authors.items(), key=lambda el : el[1].commits, reverse=True)]
         return authors_by_commits[:limit]
 
-    def collect(self) :
+    def collect(self, index_dir=None) :
+        # With -c incremental=1 the commit index of each repository is kept in index_dir
+        # and only the commits added since the previous run are walked.
         self.runstart_stamp = time.time()
+        shared_executor.configure(self.configuration['executor'], self.configuration['processes'])
+        if self.configuration['cache_dir'] :
+            object_cache.open(
+                os.path.abspath(os.path.expanduser(self.configuration['cache_dir'])),
+                self.configuration['cache_max_mb'] << 20)
         project_names = []
         for gitpath in self.gitpaths :
             print(f"Git path: {gitpath}")
@@ -943,26 +2361,230 @@ class GitStatisticsData(LogShortStatData,
             project_names.append(project_name)
             prefix_path = self.get_prefixed_path(subdir_path)
             repository = RepositoryTuple(repo_name, prefix_path=prefix_path)
-            self._collect_authors(repository)
-            self._collect_tags(repository)
-            self._collect_tags_info(repository)
-            self._collect_commits_graph(repository)
-            self._collect_files(repository)
-            self._collect_lines_modified(repository)
-            self._collect_lines_modified_by_author(repository)
-            self._collect_revlist(repository)
+            self._index_dir = None
+            if self._use_single_pass(repository) :
+                if self.configuration['incremental'] :
+                    self._index_dir = index_dir
+                collect_phases = (
+                    self._collect_tags,
+                    self._collect_tags_info,
+                    self._collect_files,
+                    self._collect_history)
+            else :
+                collect_phases = (
+                    self._collect_authors,
+                    self._collect_tags,
+                    self._collect_tags_info,
+                    self._collect_commits_graph,
+                    self._collect_files,
+                    self._collect_lines_modified,
+                    self._collect_lines_modified_by_author,
+                    self._collect_revlist)
+            for collect_phase in collect_phases :
+                with execution_trace.phase(collect_phase.__name__, repo_name) :
+                    collect_phase(repository)
             self._update_and_accumulate_authors_stats()
             os.chdir(prev_dir)
+        if object_cache.is_open() :
+            for line in object_cache.get_report() :
+                print(f"Object cache {line}")
+            object_cache.close()
+        shared_executor.close()
         if not self.configuration['project_name'] :
             self.configuration['project_name'] = ', '.join(project_names)
 
     def _collect_authors(self, repository) :
-        log_range = self.get_log_range()
+        log_range = self.get_log_range_args()
         prefix_path = repository.prefix_path
-        cmd = f"git shortlog -s {log_range} {prefix_path}"
-        pipe_out = get_pipe_output([cmd, 'cut -c8-'])
-        lines = pipe_out.split('\n')
-        self.total_authors.update(lines)
+        cmd = ['git', 'shortlog', '-s', *log_range, *prefix_path]
+        # Outputs "<commits>\t<author>"
+        self.total_authors.update(self.author_registry.get_ids(
+            line.split('\t', 1)[-1] for line in get_command_lines(cmd)))
+
+    def _use_single_pass(self, repository) :
+        # the commit index is built from the single-pass records
+        if not (self.configuration['single_pass'] or self.configuration['incremental']) :
+            return False
+        if repository.prefix_path :
+            # history simplification by path differs between the walks
+            print('Single-pass history walk is not available for subdirectories')
+            return False
+        if self.get_git_version_tuple() < (2, 31) :
+            print('Single-pass history walk requires git 2.31 or higher')
+            return False
+        return True
+
+    def _collect_history(self, repository) :
+        # One walk over the history serving _collect_authors, _collect_commits_graph,
+        # _collect_lines_modified, _collect_lines_modified_by_author and _collect_revlist.
+        if self._index_dir :
+            records = self._update_commit_index(repository).records
+        else :
+            log_range = self.get_log_range_args('HEAD')
+            records, _ = self._get_history_records(log_range)
+            self._add_tree_statistics(repository, records, log_range, Counter())
+        self._fold_history(repository, records)
+
+    def _update_commit_index(self, repository) :
+        fingerprint = (
+            os.getcwd(),
+            self.configuration['start_date'],
+            self.configuration['linear_linestats'],
+            self.configuration['lines_by_date'],
+            self.configuration['lines_by_date_sampling'])
+        index = CommitIndex.load(self._index_dir, repository.name, fingerprint)
+        head = get_command_output(['git', 'rev-parse', self.get_commit_range('HEAD')])
+        log_range = self.get_log_range_args('HEAD')
+        if index.last_head == head :
+            print(f"Commit index of {repository.name} is up to date at {head}")
+            return index
+        if index.last_head :
+            merge_base = get_command_output(['git', 'merge-base', index.last_head, head])
+            if merge_base == index.last_head :
+                log_range = [*log_range[:-1], f"{index.last_head}..{head}"]
+            else :
+                print(f"Commit index of {repository.name}: {index.last_head} is no longer \
+an ancestor of {head}, rebuilding")
+                index.clear()
+        records, next_first_parent = self._get_history_records(log_range)
+        rebuild_reason = index.last_head and records and self._get_index_rebuild_reason(
+            records, next_first_parent, index.last_head, head)
+        if rebuild_reason :
+            print(f"Commit index of {repository.name}: {rebuild_reason}, rebuilding")
+            index.clear()
+            log_range = self.get_log_range_args('HEAD')
+            records, _ = self._get_history_records(log_range)
+        print(f"Commit index of {repository.name}: adding {len(records)} commits \
+to {len(index.records)} indexed")
+        last_lines_by_authors = self._add_tree_statistics(
+            repository, records, log_range, index.last_lines_by_authors)
+        index.extend(head, records, last_lines_by_authors)
+        index.save(self._index_dir, repository.name)
+        return index
+
+    def _get_index_rebuild_reason(self, records, next_first_parent, last_head, head) :
+        # The records of last_head..head are appended to the indexed ones. That is only
+        # the order of a full walk if the full walk lists them before all indexed commits,
+        # which a merged side branch with older commits breaks, and with linear_linestats
+        # only if the first-parent line of head still passes through last_head.
+        if self.configuration['linear_linestats'] and next_first_parent != last_head :
+            return f"first-parent line of {head} bypasses {last_head}"
+        cmd = ['git', 'rev-list', f"--max-count={len(records)}",
+               *self.get_log_range_args('HEAD')]
+        if get_command_output(cmd).split() != \
+           [record.commit_hash for record in reversed(records)] :
+            return f"the walk of {head} interleaves new commits with the ones of {last_head}"
+        return None
+
+    def _get_history_records(self, log_range) :
+        # Returns the commit records oldest first and the first parent of the oldest
+        # commit reached on the first-parent line.
+        cmd = ['git', 'log', '--shortstat', '--diff-merges=first-parent',
+               '--pretty=format:%x1e%at%x1f%ai%x1f%T%x1f%H%x1f%P%x1f%aN%x1f%aE', *log_range]
+        first_parent_line, next_first_parent = self._get_first_parent_line(log_range)
+        records = []
+        for record in self._parse_history_records(get_command_lines(cmd)) :
+            on_first_parent_line = record.commit_hash in first_parent_line
+            records.append(CommitIndexRecord(
+                record.stamp, record.timezone, record.tree, record.commit_hash,
+                record.author, record.mail, len(record.parents) > 1,
+                on_first_parent_line, record.changes,
+                num_files=None, delta_lines_by_authors=None))
+        records.reverse()
+        return (records, next_first_parent)
+
+    def _add_tree_statistics(self, repository, records, log_range, prev_lines_by_authors) :
+        # The records keep the lines by author as deltas against the previous blamed
+        # commit, starting from prev_lines_by_authors. Returns the lines by author of the
+        # last blamed commit.
+        revlist_lines = [
+            ' '.join([record.stamp, record.tree, record.commit_hash]) for record in records]
+        if not self._use_blame() :
+            # full trees are only needed for blaming
+            for i, (_, num_files) in enumerate(self._num_files_by_revlist(
+                    revlist_lines, log_range, repository.prefix_path)) :
+                records[i] = records[i]._replace(num_files=num_files)
+            return prev_lines_by_authors
+        time_files_commit = GitStatisticsParallel.file_tree_by_revlist(
+            revlist_lines, repository.prefix_path)
+        delta_lines_by_authors_by_stamp, last_lines_by_authors = \
+            self._get_delta_lines_by_authors(
+                self._lines_by_authors_by_stamp(repository, time_files_commit, log_range),
+                prev_lines_by_authors)
+        for i, ((_, file_tree, _), (_, delta_lines_by_authors)) in enumerate(
+                zip(time_files_commit, delta_lines_by_authors_by_stamp)) :
+            records[i] = records[i]._replace(
+                num_files=len(file_tree), delta_lines_by_authors=delta_lines_by_authors)
+        return last_lines_by_authors
+
+    def _fold_history(self, repository, records) :
+        # Order independent statistics are updated in the order of the walk, newest
+        # first, the cumulative ones in chronological order. The records keep the author
+        # names, as the commit index outlives the author ids of a run.
+        authors = self.author_registry.get_ids(record.author for record in reversed(records))
+        self.total_authors.update(authors)
+        self._update_commit_activities(
+            [int(record.stamp) for record in reversed(records)],
+            [record.timezone for record in reversed(records)],
+            authors,
+            [record.mail for record in reversed(records)])
+        authors.reverse()
+        for record, author in zip(records, authors) :
+            if self.configuration['linear_linestats'] :
+                on_line_stats = record.on_first_parent_line
+            else :
+                # merge commits come without changes in a plain `git log --shortstat`
+                on_line_stats = not record.is_merge
+            if on_line_stats and record.changes is not None :
+                self._add_lines_modified(repository.name, record.stamp, record.changes)
+            if record.is_merge or record.changes is None :
+                self._add_merge_commit(repository.name, record.stamp, author)
+            else :
+                self._add_lines_modified_by_author(
+                    repository.name, record.stamp, author, record.changes)
+        self._update_files_by_stamp(
+            repository.name, [(record.stamp, record.num_files) for record in records])
+        if self._use_blame() :
+            self._add_delta_lines_by_date_by_author(
+                repository.name,
+                [(record.stamp, record.delta_lines_by_authors) for record in records])
+        elif self.configuration['lines_by_date'] == 'approx' :
+            self._update_lines_by_date_by_author(
+                repository.name, self._approx_lines_by_authors_by_stamp(repository))
+
+    @staticmethod
+    def _get_first_parent_line(log_range) :
+        # Returns the commits on the first-parent line of the range and the first parent
+        # of the oldest of them. The default order of `git log` may show a parent before
+        # its first-parent child when a side branch has newer dates, so the line is not
+        # followed along the walk.
+        cmd = ['git', 'rev-list', '--first-parent', '--parents', *log_range]
+        first_parent_line = set()
+        next_first_parent = None
+        for line in get_command_lines(cmd) :
+            commit_hash, *parents = line.split()
+            first_parent_line.add(commit_hash)
+            next_first_parent = parents[0] if parents else None
+        return (first_parent_line, next_first_parent)
+
+    @staticmethod
+    def _parse_history_records(lines) :
+        # Outputs:
+        # \x1e<stamp>\x1f<date>\x1f<tree>\x1f<hash>\x1f<parents>\x1f<author>\x1f<mail>
+        # N files changed, N insertions (+), N deletions (-)
+        record = None
+        for line in lines :
+            if line.startswith('\x1e') :
+                if record is not None :
+                    yield record
+                stamp, date, tree, commit_hash, parents, author, mail = line[1:].split('\x1f')
+                record = HistoryRecordTuple(
+                    stamp, date.rsplit(' ', 1)[-1], tree, commit_hash, parents.split(),
+                    author, mail, changes=None)
+            elif line :
+                record = record._replace(changes=LogShortStatData._get_modified_counts(line))
+        if record is not None :
+            yield record
 
     def _update_and_accumulate_authors_stats(self) :
         for author, stats in self._authors_of_repository.items() :
@@ -973,16 +2595,14 @@ class GitStatisticsData(LogShortStatData,
             self.authors[author] = stats.copy()
         else :
             author = self.authors[author]
-            author['last_commit_stamp'] = \
-                max((author['last_commit_stamp'], stats['last_commit_stamp']))
-            author['first_commit_stamp'] = \
-                min((author['first_commit_stamp'], stats['first_commit_stamp']))
-            author['first_active_day'] = \
-                min((author['first_active_day'], stats['first_active_day']))
-            author['active_days'].update(stats['active_days'])
-            author['commits'] += stats['commits']
-            author['lines_added'] += stats['lines_added']
-            author['lines_removed'] += stats['lines_removed']
+            author.last_commit_stamp = max((author.last_commit_stamp, stats.last_commit_stamp))
+            author.first_commit_stamp = \
+                min((author.first_commit_stamp, stats.first_commit_stamp))
+            author.first_active_day = min((author.first_active_day, stats.first_active_day))
+            author.active_days.update(stats.active_days)
+            author.commits += stats.commits
+            author.lines_added += stats.lines_added
+            author.lines_removed += stats.lines_removed
 
 class GitStatisticsWriter :
     def __init__(self, git_statistics) :
@@ -1001,6 +2621,7 @@ class GitStatisticsWriter :
         self.write_lines_of_code()
         self.write_files_by_date()
         self.write_lines_of_code_by_author()
+        execution_trace.write()
         os.chdir(prev_dir)
 
     def write_hour_of_day(self) :
@@ -1038,33 +2659,36 @@ class GitStatisticsWriter :
             for year in sorted(commits_by_year.keys()) :
                 outputfile.write(f"{year}, {commits_by_year[year]}\n")
 
-    def write_lines_and_commits_by_author(self) :
-        lines_added_by_authors = {}
-        commits_by_authors = {}
+    def _get_authors_to_write(self) :
+        # (author ids, author names, column separator), the separator is ' | ' if any
+        # name has a comma
         limit = self.git_statistics.configuration['max_authors']
         authors_to_write = self.git_statistics.get_authors(limit)
+        names_to_write = list(map(self.git_statistics.get_author_name, authors_to_write))
         separator = ', '
-        if any(map(lambda author : author.find(',') != -1, authors_to_write)) :
+        if any(map(lambda name : name.find(',') != -1, names_to_write)) :
             separator = ' | '
-        for author in authors_to_write :
-            lines_added_by_authors[author] = 0
-            commits_by_authors[author] = 0
+        return authors_to_write, names_to_write, separator
+
+    def write_lines_and_commits_by_author(self) :
+        authors_to_write, names_to_write, separator = self._get_authors_to_write()
+        lines_added_by_authors = dict.fromkeys(authors_to_write, 0)
+        commits_by_authors = dict.fromkeys(authors_to_write, 0)
         with open('lines_of_code_added_by_author.csv', 'w', encoding='utf-8') as outputfile1, \
              open('commits_by_author.csv', 'w', encoding='utf-8') as outputfile2 :
             changes_by_date_by_author = self.git_statistics.get_changes_by_date_by_author()
-            outputfile1.write('Stamp' + separator + separator.join(authors_to_write) + '\n')
-            outputfile2.write('Stamp' + separator + separator.join(authors_to_write) + '\n')
-            for stamp_key in sorted(changes_by_date_by_author.keys()) :
-                # structure of stamp_key
-                # stamp repository
-                stamp = stamp_key.split()[0]
+            authors = changes_by_date_by_author.column('author')
+            lines_added = changes_by_date_by_author.column('lines_added')
+            outputfile1.write('Stamp' + separator + separator.join(names_to_write) + '\n')
+            outputfile2.write('Stamp' + separator + separator.join(names_to_write) + '\n')
+            # one line per stamp and repository
+            for stamp, _, rows in changes_by_date_by_author.groups() :
                 outputfile1.write(f"{stamp}{separator}")
                 outputfile2.write(f"{stamp}{separator}")
-                for author in set(changes_by_date_by_author[stamp_key].keys()).intersection(
-                        authors_to_write) :
-                    lines_added_by_authors[author] += \
-                        changes_by_date_by_author[stamp_key][author]['lines_added']
-                    commits_by_authors[author] += 1
+                for row in rows :
+                    if authors[row] in lines_added_by_authors :
+                        lines_added_by_authors[authors[row]] += lines_added[row]
+                        commits_by_authors[authors[row]] += 1
                 outputfile1.write(separator.join(map(str, lines_added_by_authors.values())))
                 outputfile2.write(separator.join(map(str, commits_by_authors.values())))
                 outputfile1.write('\n')
@@ -1085,12 +2709,11 @@ class GitStatisticsWriter :
         with open('lines_of_code.csv', 'w', encoding='utf-8') as outputfile :
             total_lines = 0
             outputfile.write('Timestamp, Total Lines\n')
-            for stamp_key in sorted(changes_by_date.keys()) :
-                # structure of stamp_key
-                # stamp repository
-                stamp = stamp_key.split()[0]
-                total_lines += changes_by_date[stamp_key]['inserted']
-                total_lines -= changes_by_date[stamp_key]['deleted']
+            inserted = changes_by_date.column('inserted')
+            deleted = changes_by_date.column('deleted')
+            for stamp, _, rows in changes_by_date.groups() :
+                for row in rows :
+                    total_lines += inserted[row] - deleted[row]
                 outputfile.write(f"{stamp}, {total_lines}\n")
 
     def write_files_by_date(self) :
@@ -1098,11 +2721,10 @@ class GitStatisticsWriter :
         total_files = 0
         with open('files_by_date.csv', 'w', encoding='utf-8') as outputfile :
             outputfile.write('Timestamp, Total files\n')
-            for stamp_key in sorted(files_by_stamp.keys()) :
-                # structure of stamp_key
-                # stamp repository
-                stamp = stamp_key.split()[0]
-                total_files += files_by_stamp[stamp_key]['delta_files']
+            delta_files = files_by_stamp.column('delta_files')
+            for stamp, _, rows in files_by_stamp.groups() :
+                for row in rows :
+                    total_files += delta_files[row]
                 outputfile.write(f"{stamp}, {total_files}\n")
 
     def write_lines_of_code_by_author(self) :
@@ -1111,20 +2733,19 @@ class GitStatisticsWriter :
         lines_by_authors = {}
         limit = self.git_statistics.configuration['max_authors']
         authors_to_write = self.git_statistics.get_authors(limit)
+        names_to_write = list(map(self.git_statistics.get_author_name, authors_to_write))
         for author in authors_to_write :
             lines_by_authors[author] = 0
         with open('lines_of_code_by_author.csv', 'w', encoding='utf-8') as outputfile :
             lines_by_date_by_author = self.git_statistics.get_lines_by_date_by_author()
-            outputfile.write('Stamp, ' + ', '.join(authors_to_write) + '\n')
-            for stamp_key in sorted(lines_by_date_by_author.keys()) :
-                # structure of stamp_key
-                # stamp repository
-                stamp = stamp_key.split()[0]
+            outputfile.write('Stamp, ' + ', '.join(names_to_write) + '\n')
+            authors = lines_by_date_by_author.column('author')
+            delta_lines = lines_by_date_by_author.column('delta_lines')
+            for stamp, _, rows in lines_by_date_by_author.groups() :
                 outputfile.write(f"{stamp}, ")
-                for author in set(lines_by_date_by_author[stamp_key].keys()).intersection(
-                        authors_to_write) :
-                    lines_by_authors[author] += \
-                        lines_by_date_by_author[stamp_key][author]['delta_lines']
+                for row in rows :
+                    if authors[row] in lines_by_authors :
+                        lines_by_authors[authors[row]] += delta_lines[row]
                 outputfile.write(', '.join(map(str, lines_by_authors.values())))
                 outputfile.write('\n')
 
@@ -1143,6 +2764,14 @@ def main(args_orig) :
         'processes': 8,
         'start_date': '',
         'lines_by_date': 0,
+        'single_pass': 0,
+        'incremental': 0,
+        'cache_dir': '',
+        'cache_max_mb': 512,
+        'lines_by_date_sampling': '',
+        'executor': 'thread',
+        'spooled_output': 0,
+        'shortstat_shards': 0,
     }
     def usage() :
         print(f"""
@@ -1162,7 +2791,9 @@ Please see the manual page for more details.""")
             key, value = val.split('=', 1)
             if key not in conf :
                 raise KeyError(f"No such key \"{key}\" in config")
-            if isinstance(conf[key], int) :
+            if key == 'lines_by_date' and value == 'approx' :
+                conf[key] = value
+            elif isinstance(conf[key], int) :
                 conf[key] = int(value)
             else :
                 conf[key] = value
@@ -1185,14 +2816,15 @@ Please see the manual page for more details.""")
         sys.exit(1)
 
     git_statistics = GitStatisticsData(conf, gitpaths)
-    git_statistics.collect()
+    git_statistics.collect(outputpath)
     statistics_writer = GitStatisticsWriter(git_statistics)
     statistics_writer.write(outputpath)
 
     time_end = time.time()
     exectime_total = time_end - time_start
-    print(f"Execution time {exectime_total:.5f} secs, {get_pipe_output.exectime_commands:.5f} secs \
-({(get_pipe_output.exectime_commands/exectime_total):.2%}) in external commands")
+    exectime_commands = get_exectime_commands()
+    print(f"Execution time {exectime_total:.5f} secs, {exectime_commands:.5f} secs \
+({(exectime_commands/exectime_total):.2%}) in external commands")
 
 if __name__ == '__main__' :
     main(sys.argv[1:])
@@ -0,0 +1,84 @@
+# -*- python-indent-offset: 4 -*-
+"""
+Copyright (C) 2021-  Marian Piatkowski
+
+This file is a part of GitStats2.
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, version 3.
+
+This program is distributed in the hope that it will be useful, but
+WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import os
+import pickle
+import tempfile
+from collections import namedtuple
+
+# one record per commit, oldest first; delta_lines_by_authors are the (author, delta
+# lines) against the previous commit with blamed lines, None for a commit not blamed
+CommitIndexRecord = namedtuple(
+    'CommitIndexRecord',
+    'stamp timezone tree commit_hash author mail is_merge on_first_parent_line changes '
+    'num_files delta_lines_by_authors')
+
+class CommitIndex :
+    # Bump whenever CommitIndexRecord or the meaning of its fields changes.
+    version = 2
+
+    def __init__(self, fingerprint, last_head='', records=None, last_lines_by_authors=None) :
+        self.fingerprint = fingerprint
+        self.last_head = last_head
+        self.records = records if records is not None else []
+        # lines by author of the last commit with blamed lines, the base of the deltas
+        # of the commits added next
+        self.last_lines_by_authors = \
+            last_lines_by_authors if last_lines_by_authors is not None else {}
+
+    @staticmethod
+    def get_filename(index_dir, repository) :
+        return os.path.join(index_dir, f"gitstats2_index_{repository}.pkl")
+
+    @classmethod
+    def load(cls, index_dir, repository, fingerprint) :
+        # an unreadable index or one written with other settings means a full rebuild
+        try :
+            with open(cls.get_filename(index_dir, repository), 'rb') as fin :
+                version, saved_fingerprint, last_head, last_lines_by_authors, records = \
+                    pickle.load(fin)
+        except (OSError, EOFError, ValueError, TypeError, pickle.UnpicklingError) :
+            return cls(fingerprint)
+        if version != cls.version or saved_fingerprint != fingerprint :
+            return cls(fingerprint)
+        return cls(fingerprint, last_head, records, last_lines_by_authors)
+
+    def save(self, index_dir, repository) :
+        filename = self.get_filename(index_dir, repository)
+        fd, tmpname = tempfile.mkstemp(dir=index_dir, suffix='.tmp')
+        try :
+            with os.fdopen(fd, 'wb') as fout :
+                pickle.dump(
+                    (self.version, self.fingerprint, self.last_head,
+                     self.last_lines_by_authors, self.records),
+                    fout, pickle.HIGHEST_PROTOCOL)
+            os.replace(tmpname, filename)
+        except BaseException :
+            os.unlink(tmpname)
+            raise
+
+    def extend(self, head, records, last_lines_by_authors) :
+        self.last_head = head
+        self.records.extend(records)
+        self.last_lines_by_authors = last_lines_by_authors
+
+    def clear(self) :
+        self.last_head = ''
+        self.records = []
+        self.last_lines_by_authors = {}
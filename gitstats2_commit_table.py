@@ -0,0 +1,99 @@
+# -*- python-indent-offset: 4 -*-
+"""
+Copyright (C) 2021-  Marian Piatkowski
+
+This file is a part of GitStats2.
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, version 3.
+
+This program is distributed in the hope that it will be useful, but
+WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+from array import array
+
+try :
+    import numpy as np
+except ImportError :
+    np = None
+
+class CommitTable :
+    # Per-commit statistics of all repositories, one row per commit and one int64 array
+    # per column. Every table has a stamp and a repository id column. The rows are
+    # appended in any order and read in the order of (stamp, repository), which is
+    # sorted once after the last append. The columns support the buffer protocol, so
+    # e.g. np.frombuffer(table.column('stamp'), dtype=np.int64) is a view without a copy.
+    def __init__(self, columns) :
+        self.columns = {name : array('q') for name in ('stamp', 'repository', *columns)}
+        self._order = []
+
+    def append(self, *values) :
+        # values of all columns in order, starting with stamp and repository
+        for column, value in zip(self.columns.values(), values) :
+            column.append(value)
+
+    def column(self, name) :
+        return self.columns[name]
+
+    def __len__(self) :
+        return len(self.columns['stamp'])
+
+    def get_order(self) :
+        # Row indices sorted by (stamp, repository), rows with the same stamp and
+        # repository in the order they were appended.
+        if len(self._order) != len(self) :
+            stamps = self.columns['stamp']
+            repositories = self.columns['repository']
+            if np is not None :
+                self._order = np.lexsort((
+                    np.frombuffer(repositories, dtype=np.int64),
+                    np.frombuffer(stamps, dtype=np.int64))).tolist()
+            else :
+                self._order = sorted(
+                    range(len(self)), key=lambda row : (stamps[row], repositories[row]))
+        return self._order
+
+    def groups(self) :
+        # Yields (stamp, repository, row indices) of the rows with the same stamp and
+        # repository, in sorted order.
+        stamps = self.columns['stamp']
+        repositories = self.columns['repository']
+        key = None
+        rows = []
+        for row in self.get_order() :
+            row_key = (stamps[row], repositories[row])
+            if row_key != key :
+                if rows :
+                    yield (*key, rows)
+                key = row_key
+                rows = []
+            rows.append(row)
+        if rows :
+            yield (*key, rows)
+
+    def rows(self) :
+        # tuples of all columns in sorted order
+        columns = list(self.columns.values())
+        return [tuple(column[row] for column in columns) for row in self.get_order()]
+
+    def __eq__(self, other) :
+        if not isinstance(other, CommitTable) :
+            return NotImplemented
+        return list(self.columns) == list(other.columns) and self.rows() == other.rows()
+
+    __hash__ = None
+
+    def __getstate__(self) :
+        # the order is sorted again after loading
+        return {'columns' : self.columns}
+
+    def __setstate__(self, state) :
+        self.columns = state['columns']
+        self._order = []
@@ -0,0 +1,100 @@
+# -*- python-indent-offset: 4 -*-
+"""
+Copyright (C) 2021-  Marian Piatkowski
+
+This file is a part of GitStats2.
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, version 3.
+
+This program is distributed in the hope that it will be useful, but
+WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import os
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from concurrent.futures import wait, FIRST_COMPLETED
+
+backends = ('thread', 'process')
+
+def _call_in(cwd, func, arg) :
+    # A process worker outlives the repository it was forked in, so the task runs in
+    # the directory of the caller. Thread workers already share the caller's directory.
+    if os.getcwd() != cwd :
+        os.chdir(cwd)
+    return func(arg)
+
+class SharedExecutor :
+    # One pool of workers for the whole run, shared by all collection phases and
+    # repositories. The workers mostly wait on git subprocesses, so threads do as well
+    # as processes without forking and without pickling the results back.
+    def __init__(self) :
+        self.backend = 'thread'
+        self.max_workers = 1
+        self.executor = None
+
+    def is_process_backend(self) :
+        return self.backend == 'process'
+
+    def configure(self, backend, max_workers) :
+        if backend not in backends :
+            raise ValueError(f"Unknown executor \"{backend}\", expected one of {backends}")
+        if (backend, max_workers) != (self.backend, self.max_workers) :
+            self.close()
+        self.backend = backend
+        self.max_workers = max(1, max_workers)
+
+    def get(self) :
+        # the workers are started on first use
+        if self.executor is None :
+            if self.is_process_backend() :
+                self.executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            else :
+                self.executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        return self.executor
+
+    def map(self, func, args) :
+        args = list(args)
+        chunksize = max(1, len(args) // (4 * self.max_workers))
+        if self.is_process_backend() :
+            return list(self.get().map(
+                _call_in, [os.getcwd()] * len(args), [func] * len(args), args,
+                chunksize=chunksize))
+        return list(self.get().map(func, args))
+
+    def imap_unordered(self, func, args) :
+        # Yields (arg, result) as the tasks complete. Tasks are dispatched in the order of
+        # args, with a bounded number of them queued so the workers never run dry.
+        executor = self.get()
+        if self.is_process_backend() :
+            submit = partial(executor.submit, _call_in, os.getcwd(), func)
+        else :
+            submit = partial(executor.submit, func)
+        max_pending = 4 * self.max_workers
+        args = iter(args)
+        pending = {}
+        while True :
+            for arg in args :
+                pending[submit(arg)] = arg
+                if len(pending) >= max_pending :
+                    break
+            if not pending :
+                return
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done :
+                yield (pending.pop(future), future.result())
+
+    def close(self) :
+        if self.executor is None :
+            return
+        self.executor.shutdown()
+        self.executor = None
+
+shared_executor = SharedExecutor()
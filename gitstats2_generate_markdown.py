@@ -223,7 +223,8 @@ class RMarkdownFile :
             timedelta = last_commit - first_commit
             active_days = len(author_stats['active_days'])
             ranking = i
-            row = [author, f"{commits} ({(commits/total_commits):.2%})",
+            row = [self.git_statistics.get_author_name(author),
+                   f"{commits} ({(commits/total_commits):.2%})",
                    lines_added, lines_removed,
                    first_commit.strftime("%Y-%m-%d"), last_commit.strftime("%Y-%m-%d"),
                    timedelta, active_days, ranking]
@@ -237,8 +238,9 @@ class RMarkdownFile :
 
         rest_authors = set(authors.keys()).difference(authors_to_write)
         if rest_authors :
+            rest_names = map(self.git_statistics.get_author_name, rest_authors)
             results['more_authors_list'] = \
-                f"These didn't make it to the top: {', '.join(rest_authors)}"
+                f"These didn't make it to the top: {', '.join(rest_names)}"
         else :
             results['more_authors_list'] = ''
 
@@ -251,10 +253,12 @@ class RMarkdownFile :
             commits_by_month = sum(authors.values())
             authors_by_commits = sorted(authors, key=authors.get, reverse=True)
             most_commits = authors[authors_by_commits[0]]
-            authors_top_rest = ', '.join(authors_by_commits[1:limit+1])
+            names_by_commits = list(map(
+                self.git_statistics.get_author_name, authors_by_commits[:limit+1]))
+            authors_top_rest = ', '.join(names_by_commits[1:])
             # pylint: disable=C0301
             row = [
-                yymm, authors_by_commits[0],
+                yymm, names_by_commits[0],
                 f"{most_commits} ({(most_commits/commits_by_month):.2%} of {commits_by_month})",
                 authors_top_rest, len(authors)]
             table.append(row)
@@ -273,10 +277,12 @@ class RMarkdownFile :
             commits_by_year = sum(authors.values())
             authors_by_commits = sorted(authors, key=authors.get, reverse=True)
             most_commits = authors[authors_by_commits[0]]
-            authors_top_rest = ', '.join(authors_by_commits[1:limit+1])
+            names_by_commits = list(map(
+                self.git_statistics.get_author_name, authors_by_commits[:limit+1]))
+            authors_top_rest = ', '.join(names_by_commits[1:])
             # pylint: disable=C0301
             row = [
-                year, authors_by_commits[0],
+                year, names_by_commits[0],
                 f"{most_commits} ({(most_commits/commits_by_year):.2%} of {commits_by_year})",
                 authors_top_rest, len(authors)]
             table.append(row)
@@ -331,6 +337,34 @@ class RMarkdownFile :
                 '![LinesOfCodeByAuthor](lines_of_code_by_author.png)'
         else :
             results['lines_of_code_by_author_png'] = ''
+        self._fill_lines_by_date_sampling_table(results)
+
+    def _fill_lines_by_date_sampling_table(self, results) :
+        sampling_by_repository = self.git_statistics.get_lines_by_date_sampling()
+        if not sampling_by_repository :
+            results['lines_by_date_sampling_table'] = ''
+            return
+        table = []
+        for repository, sampling in sampling_by_repository.items() :
+            num_samples = len(sampling['stamps'])
+            speedup = sampling['total_blames'] / max(sampling['blames'], 1)
+            sampled_dates = [
+                datetime.datetime.fromtimestamp(int(stamp)).strftime("%Y-%m-%d")
+                for stamp in sampling['stamps']]
+            row = [
+                repository, sampling['sampling'],
+                f"{num_samples} ({(num_samples/sampling['revisions']):.2%} of \
+{sampling['revisions']})",
+                f"{sampling['blames']} of {sampling['total_blames']}",
+                f"{speedup:.1f}x",
+                ', '.join(sampled_dates)]
+            table.append(row)
+        data = pd.DataFrame(
+            table,
+            columns=['Repository', 'Sampling', 'Sampled revisions (%)', 'Blamed files',
+                     'Speedup', 'Sampled dates'])
+        results['lines_by_date_sampling_table'] = \
+            data.to_markdown(index=False, tablefmt="github", numalign="center")
 
     def _fill_tags(self, results) :
         tags = self.git_statistics.tags
@@ -354,8 +388,7 @@ class RMarkdownFile :
         _df = pd.DataFrame(tags_table, columns=["Repository", "Name", "Date", "Commits", "Authors"])
         results['tags_table'] = _df.to_markdown(index=False, tablefmt="github", numalign="center")
 
-    @staticmethod
-    def _fill_tags_table(repository, tags) :
+    def _fill_tags_table(self, repository, tags) :
         tags_table = []
         for tagname, tagdetails in tags[repository].items() :
             tags_row = [repository, tagname]
@@ -363,7 +396,8 @@ class RMarkdownFile :
             tags_row.append(tagdetails['commits'])
             authors_w_commits = []
             for author, commits in tagdetails['authors'].items() :
-                authors_w_commits.append(f"{author} ({commits})")
+                authors_w_commits.append(
+                    f"{self.git_statistics.get_author_name(author)} ({commits})")
             tags_row.append(', '.join(authors_w_commits))
             tags_table.append(tags_row)
         return tags_table
@@ -187,6 +187,8 @@ Lines of code
 $lines_of_code_png
 $lines_of_code_by_author_png
 
+$lines_by_date_sampling_table
+
 ### Tags
 
 #### Total tags:
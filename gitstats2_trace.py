@@ -0,0 +1,103 @@
+# -*- python-indent-offset: 4 -*-
+"""
+Copyright (C) 2021-  Marian Piatkowski
+
+This file is a part of GitStats2.
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, version 3.
+
+This program is distributed in the hope that it will be useful, but
+WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import os
+import time
+import json
+import threading
+from contextlib import contextmanager
+
+filename = 'gitstats2_trace.json'
+
+class ExecutionTrace :
+    # Events are kept in the Chrome trace event format, complete events ('X')
+    # with microsecond timestamps, so they can be loaded into Perfetto as is.
+    def __init__(self) :
+        self.events = []
+
+    def add_command(self, kind, command, start, end, bytes_out) :
+        self.events.append(self._complete_event(
+            kind, 'command', start, end,
+            {'command' : command,
+             'repository' : os.path.basename(os.getcwd()),
+             'bytes_out' : bytes_out }))
+
+    @contextmanager
+    def phase(self, name, repository) :
+        start = time.time()
+        try :
+            yield
+        finally :
+            self.events.append(self._complete_event(
+                name, 'phase', start, time.time(), {'repository' : repository}))
+
+    def mark(self) :
+        return len(self.events)
+
+    def take_since(self, mark) :
+        # events recorded after mark, e.g. by a pool worker while running one task
+        events = self.events[mark:]
+        del self.events[mark:]
+        return events
+
+    def merge(self, events) :
+        self.events.extend(events)
+
+    def get_command_time(self, events=None) :
+        if events is None :
+            events = self.events
+        return sum(event['dur'] for event in events if event['cat'] == 'command') / 1e6
+
+    def get_command_wall_time(self, events=None) :
+        # the length of the union of the command intervals, in seconds
+        if events is None :
+            events = self.events
+        wall_time = 0
+        end = None
+        for event in sorted((event for event in events if event['cat'] == 'command'),
+                            key=lambda event : event['ts']) :
+            event_end = event['ts'] + event['dur']
+            if end is None or event['ts'] >= end :
+                wall_time += event['dur']
+                end = event_end
+            elif event_end > end :
+                wall_time += event_end - end
+                end = event_end
+        return wall_time / 1e6
+
+    def write(self, outputfilename=filename) :
+        with open(outputfilename, 'w', encoding='utf-8') as outputfile :
+            json.dump(
+                {'traceEvents' : sorted(self.events, key=lambda event : event['ts']),
+                 'displayTimeUnit' : 'ms'},
+                outputfile)
+
+    @staticmethod
+    def _complete_event(name, category, start, end, args) :
+        return {
+            'name' : name,
+            'cat' : category,
+            'ph' : 'X',
+            'ts' : int(start * 1e6),
+            'dur' : int((end - start) * 1e6),
+            'pid' : os.getpid(),
+            'tid' : threading.get_ident(),
+            'args' : args }
+
+execution_trace = ExecutionTrace()
@@ -0,0 +1,84 @@
+# -*- python-indent-offset: 4 -*-
+"""
+Copyright (C) 2021-  Marian Piatkowski
+
+This file is a part of GitStats2.
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, version 3.
+
+This program is distributed in the hope that it will be useful, but
+WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import tempfile
+import unittest
+from collections import Counter
+from multiprocessing import Pool
+from functools import partial
+from gitstats2_cache import ObjectCache
+
+def put_linecounts(cache_dir, worker) :
+    cache = ObjectCache()
+    cache.open(cache_dir, 1 << 20)
+    for i in range(20) :
+        cache.put_many('lines_in_blob', [(f"blob{i}", i)])
+        cache.get_many('lines_in_blob', [f"blob{worker}"])
+    cache.close()
+    return worker
+
+class ObjectCacheTestCase(unittest.TestCase) :
+    def tearDown(self) :
+        print(f"=== {self.id()}")
+
+    def test_hits_and_misses(self) :
+        with tempfile.TemporaryDirectory() as cache_dir :
+            cache = ObjectCache()
+            cache.open(cache_dir, 1 << 20)
+            cache.put_many('lines_by_authors', [('c1:README', Counter({'author' : 3}))])
+            found = cache.get_many('lines_by_authors', ['c1:README', 'c1:LICENSE'])
+            cache.close()
+        self.assertEqual(found, {'c1:README' : Counter({'author' : 3})})
+        self.assertEqual(cache.get_report(), ['lines_by_authors: 1 hits, 1 misses'])
+
+    def test_closed_cache(self) :
+        cache = ObjectCache()
+        cache.put_many('lines_in_blob', [('blob', 1)])
+        self.assertEqual(cache.get_many('lines_in_blob', ['blob']), {})
+        self.assertEqual(cache.get_report(), [])
+
+    def test_evict_least_recently_used(self) :
+        with tempfile.TemporaryDirectory() as cache_dir :
+            cache = ObjectCache()
+            cache.open(cache_dir, 1 << 20)
+            cache.put_many('files_in_tree', [('old', ['a'] * 1000)])
+            cache.put_many('files_in_tree', [('new', ['b'] * 1000)])
+            cache.get_many('files_in_tree', ['old'])
+            cache.put_many('files_in_tree', [('newest', ['c'] * 1000)])
+            size = cache.connection.execute('SELECT MAX(size) FROM objects').fetchone()[0]
+            cache.max_size = 2 * size + size // 2
+            cache.close()
+            cache.open(cache_dir, 1 << 20)
+            found = cache.get_many('files_in_tree', ['old', 'new', 'newest'])
+            cache.close()
+        self.assertEqual(sorted(found), ['newest', 'old'])
+
+    def test_concurrent_runs(self) :
+        with tempfile.TemporaryDirectory() as cache_dir :
+            with Pool(processes=4) as pool :
+                workers = pool.map(partial(put_linecounts, cache_dir), range(4))
+            cache = ObjectCache()
+            cache.open(cache_dir, 1 << 20)
+            found = cache.get_many('lines_in_blob', [f"blob{i}" for i in range(20)])
+            cache.close()
+        self.assertEqual(workers, list(range(4)))
+        self.assertEqual(found, {f"blob{i}" : i for i in range(20)})
+
+if __name__ == '__main__' :
+    unittest.main()
@@ -19,10 +19,14 @@ along with this program. If not, see <http://www.gnu.org/licenses/>.
 
 import os
 import time
+import datetime
 import re
 import collections
 import unittest
 import warnings
+import tempfile
+import pickle
+import subprocess
 from collections import Counter
 from multiprocessing import Pool
 from functools import partial
@@ -138,7 +142,7 @@ class GitStatisticsRevListTestCase(unittest.TestCase) :
         lines = pipe_out.strip().split('\n')
         lines.reverse()
         time_files_commit = gitstats2.GitStatisticsParallel.file_tree_by_revlist(
-            lines, self.git_statistics.configuration['processes'], quiet=True)
+            lines, [], quiet=True)
         # test whether time_files_commit result is ordered by timestamp
         # so ignore filetree for now and only compare the order of stamps and commit hashes
         time_commit = [(stamp, commit_hash) for stamp, _, commit_hash in time_files_commit]
@@ -146,6 +150,28 @@ class GitStatisticsRevListTestCase(unittest.TestCase) :
         os.chdir(prev_dir)
         self.assertEqual(time_commit, expected)
 
+    def test_file_tree_shared_subtrees(self) :
+        gitpath = self.git_statistics.get_gitpaths()[0]
+        prev_dir = os.getcwd()
+        os.chdir(gitpath)
+        cmd = f"git rev-list --pretty=format:\"%at %T %H\" {self.git_statistics.get_log_range('HEAD')}"
+        pipe_out = gitstats2.get_pipe_output([cmd, 'grep -v ^commit'])
+        lines = pipe_out.strip().split('\n')
+        lines.reverse()
+        time_files_commit = gitstats2.GitStatisticsParallel.file_tree_by_revlist(
+            lines, [], quiet=True)
+        expected = self._file_tree_by_revlist_sequential(lines)
+        os.chdir(prev_dir)
+        self.assertEqual(
+            [(stamp, list(file_tree), commit_hash)
+             for stamp, file_tree, commit_hash in time_files_commit],
+            expected)
+        # revisions with the same tree share the listing
+        file_tree_by_tree = {}
+        for line, (_, file_tree, _) in zip(lines, time_files_commit) :
+            tree = line.split()[1]
+            self.assertIs(file_tree_by_tree.setdefault(tree, file_tree), file_tree)
+
     @staticmethod
     def _file_tree_by_revlist_sequential(lines) :
         time_files_commit = []
@@ -377,6 +403,662 @@ class GitStatisticsCollectTestCase(unittest.TestCase) :
         os.chdir(prev_dir)
         self.assertEqual(ext_linecount, self._get_expected_ext_linecount())
 
+    def test_ext_linecount_cat_file_batch(self) :
+        gitpath = self.git_statistics.get_gitpaths()[0]
+        prev_dir = os.getcwd()
+        os.chdir(gitpath)
+        ext_blob = self._get_expected_ext_blob()
+        ext_linecount = gitstats2.GitStatisticsParallel.ext_lines_by_blob(ext_blob, processes=3)
+        os.chdir(prev_dir)
+        self.assertEqual(ext_linecount, self._get_expected_ext_linecount())
+
+class GitFileCountByDiffTestCase(unittest.TestCase) :
+    def setUp(self) :
+        self.time_start = time.time()
+
+    def tearDown(self) :
+        time_end = time.time()
+        print(f"=== Execution time of {self.id()}, {(time_end-self.time_start):.3f}s")
+
+    def test_parse_raw_diff(self) :
+        lines = [
+            '\x1ec1',
+            ':000000 100644 0000000 1111111 A\tREADME',
+            ':000000 160000 0000000 2222222 A\tlib/module',
+            '',
+            '\x1ec2 c1',
+            ':100644 120000 1111111 3333333 T\tREADME',
+            ':100644 000000 4444444 0000000 D\t"caf\\303\\251"',
+            '',
+            '\x1ec3 c2 c4']
+        self.assertEqual(
+            list(gitstats2.GitFilesStatistics._parse_raw_diff(lines)),
+            [('c1', None, [('000000', '100644', 'README'), ('000000', '160000', 'lib/module')]),
+             ('c2', 'c1', [('100644', '120000', 'README'), ('100644', '000000', 'caf\u00e9')]),
+             ('c3', 'c2', [])])
+
+    def test_blame_steps(self) :
+        time_files_commit = [
+            ('1', ('a', 'b'), 'c1'),
+            ('2', ('a', 'b', 'c'), 'c2'),
+            ('3', ('a', 'c'), 'c3'),
+            ('4', ('a', 'b'), 'c4')]
+        changes_by_commit = {
+            'c1' : (None, {'a', 'b'}),
+            'c2' : ('c1', {'c'}),
+            'c3' : ('c2', {'a', 'b'}),
+            # c4 branches off c2
+            'c4' : ('c2', {'c'})}
+        self.assertEqual(
+            gitstats2.GitFilesStatistics._get_blame_steps(time_files_commit, changes_by_commit),
+            [('1', 'c1', None, [], [('c1', 'a'), ('c1', 'b')]),
+             ('2', 'c2', 'c1', [], [('c2', 'c')]),
+             ('3', 'c3', 'c2', [('c1', 'a'), ('c1', 'b')], [('c3', 'a')]),
+             ('4', 'c4', 'c2', [('c2', 'c')], [])])
+
+    def test_num_files_by_revlist(self) :
+        git_statistics = gitstats2.GitFilesStatistics(
+            {'commit_end' : 'HEAD', 'start_date' : '', 'processes' : 4},
+            ["/Users/tasmania/packages/test-repos-gitstats2/ABAPInEmacs/"])
+        prev_dir = os.getcwd()
+        os.chdir(git_statistics.gitpaths[0])
+        log_range = git_statistics.get_log_range_args('HEAD')
+        cmd = ['git', 'rev-list', '--reverse', '--pretty=format:%at %T %H', *log_range]
+        lines = list(gitstats2.skip_commit_lines(gitstats2.get_command_lines(cmd)))
+        time_num_files = git_statistics._num_files_by_revlist(lines, log_range, [])
+        expected = [
+            (timestamp, len(file_tree)) for timestamp, file_tree, _ in
+            gitstats2.GitStatisticsParallel.file_tree_by_revlist(lines, [])]
+        os.chdir(prev_dir)
+        self.assertEqual(time_num_files, expected)
+
+class BlameIncrementalParserTestCase(unittest.TestCase) :
+    def setUp(self) :
+        self.time_start = time.time()
+
+    def tearDown(self) :
+        time_end = time.time()
+        print(f"=== Execution time of {self.id()}, {(time_end-self.time_start):.3f}s")
+
+    def test_parse_blame_incremental(self) :
+        lines = [
+            'c1 1 1 3',
+            'author Marvin',
+            'author-mail <marvin@example.com>',
+            'summary author counts',
+            'boundary',
+            'filename README',
+            'c2 4 4 2',
+            'author Marian Piatkowski',
+            'summary Update README',
+            'previous c1 README',
+            'filename README',
+            'warning: unable to access \'/root/.config/git/attributes\': Permission denied',
+            'c1 7 6 1',
+            'filename README']
+        self.assertEqual(
+            gitstats2.GitStatisticsParallel.parse_blame_incremental(lines),
+            Counter({'Marvin' : 4, 'Marian Piatkowski' : 2}))
+
+    def test_same_as_line_porcelain(self) :
+        gitpath = os.path.dirname(os.path.abspath(__file__))
+        prev_dir = os.getcwd()
+        os.chdir(gitpath)
+        commit_hash = gitstats2.get_command_output(['git', 'rev-parse', 'HEAD'], quiet=True)
+        file_tree = gitstats2.get_command_output(
+            ['git', 'ls-tree', '-r', '--name-only', commit_hash], quiet=True).split('\n')
+        for revfile in file_tree :
+            cmd = ['git', 'blame', '--line-porcelain', commit_hash, '--', revfile]
+            expected = Counter(
+                line[7:] for line in gitstats2.get_command_lines(cmd, quiet=True)
+                if line.startswith('author '))
+            self.assertEqual(
+                gitstats2.GitStatisticsParallel.add_lines_by_authors(revfile, commit_hash),
+                expected, revfile)
+        os.chdir(prev_dir)
+
+class GitContributionActivityTestCase(unittest.TestCase) :
+    def setUp(self) :
+        self.time_start = time.time()
+
+    def tearDown(self) :
+        time_end = time.time()
+        print(f"=== Execution time of {self.id()}, {(time_end-self.time_start):.3f}s")
+
+    @staticmethod
+    def _activity(commits, vectorized) :
+        activity = gitstats2.GitContributionActivity({}, [])
+        activity._authors_of_repository = {}
+        numpy_module = gitstats2.np
+        if not vectorized :
+            gitstats2.np = None
+        try :
+            for batch in commits :
+                activity._update_commit_activities(*map(list, zip(*batch)))
+        finally :
+            gitstats2.np = numpy_module
+        return activity
+
+    @unittest.skipIf(gitstats2.np is None, 'NumPy is not installed')
+    def test_vectorized_same_as_per_commit(self) :
+        # hourly commits around the end of daylight saving time in Europe and a year apart
+        stamps = [1667088000 + i * 3600 + author for i in range(-30, 30) for author in range(3)]
+        stamps += [stamp + 365 * 86400 for stamp in stamps[::7]]
+        commits = [(stamp, ['+0100', '-0330', '+0000'][stamp % 3], stamp % 3,
+                    f"author{stamp % 3}@domain{stamp % 2}.org" if stamp % 5 else 'unknown')
+                   for stamp in stamps]
+        commits = [commits[:50], commits[50:]]
+        expected = self._activity(commits, vectorized=False)
+        actual = self._activity(commits, vectorized=True)
+        for attribute in (
+                'total_commits', 'first_commit_stamp', 'last_commit_stamp', 'domains',
+                'activity_by_hour_of_day', 'activity_by_hour_of_day_busiest',
+                'activity_by_day_of_week', 'activity_by_hour_of_week',
+                'activity_by_hour_of_week_busiest', 'activity_by_month_of_year',
+                'activity_by_year_week', 'activity_by_year_week_peak', 'author_of_month',
+                'commits_by_month', 'author_of_year', 'commits_by_year', 'first_active_day',
+                'active_days', 'commits_by_timezone', '_authors_of_repository') :
+            self.assertEqual(getattr(actual, attribute), getattr(expected, attribute), attribute)
+        self.assertEqual(list(actual.author_of_month), list(expected.author_of_month))
+
+class ActiveDaysTestCase(unittest.TestCase) :
+    def setUp(self) :
+        self.time_start = time.time()
+
+    def tearDown(self) :
+        time_end = time.time()
+        print(f"=== Execution time of {self.id()}, {(time_end-self.time_start):.3f}s")
+
+    def test_same_as_set(self) :
+        first = datetime.date(2021, 3, 1).toordinal()
+        days = [first + offset for offset in (40, 3, 40, 900, 0, 17)]
+        others = [first + offset for offset in (-5, 17, 2000)]
+        active_days = gitstats2.ActiveDays()
+        for day in days :
+            active_days.add(day)
+        self.assertEqual(len(active_days), len(set(days)))
+        self.assertEqual(
+            list(active_days), [datetime.date.fromordinal(day) for day in sorted(set(days))])
+        union = active_days.copy()
+        union.update(gitstats2.ActiveDays(others))
+        self.assertEqual(len(union), len(set(days) | set(others)))
+        self.assertEqual(union, gitstats2.ActiveDays(sorted(set(days) | set(others))))
+        self.assertEqual(active_days, gitstats2.ActiveDays(reversed(days)))
+        self.assertNotEqual(active_days, union)
+        union.update(gitstats2.ActiveDays())
+        self.assertEqual(len(union), len(set(days) | set(others)))
+        self.assertEqual(len(gitstats2.ActiveDays()), 0)
+
+class GitTagsDataTestCase(unittest.TestCase) :
+    def setUp(self) :
+        self.time_start = time.time()
+
+    def tearDown(self) :
+        time_end = time.time()
+        print(f"=== Execution time of {self.id()}, {(time_end-self.time_start):.3f}s")
+
+    @staticmethod
+    def _git(*args, author='a', stamp=0) :
+        env = dict(os.environ,
+                   GIT_AUTHOR_NAME=author, GIT_AUTHOR_EMAIL=f"{author}@example.com",
+                   GIT_COMMITTER_NAME=author, GIT_COMMITTER_EMAIL=f"{author}@example.com",
+                   GIT_AUTHOR_DATE=f"{1600000000 + stamp * 86400} +0000",
+                   GIT_COMMITTER_DATE=f"{1600000000 + stamp * 86400} +0000")
+        subprocess.run(['git', *args], env=env, check=True, stdout=subprocess.DEVNULL)
+
+    def _commit(self, author, stamp) :
+        self._git('commit', '-q', '--allow-empty', '-m', f"{author} {stamp}",
+                  author=author, stamp=stamp)
+
+    def test_tags_same_as_shortlog(self) :
+        prev_dir = os.getcwd()
+        with tempfile.TemporaryDirectory() as gitpath :
+            os.chdir(gitpath)
+            self._git('init', '-q')
+            self._commit('a', 0)
+            self._commit('b', 1)
+            self._git('tag', 'v1')
+            self._git('tag', '-a', '-m', 'v1', 'v1-annotated')
+            self._commit('a', 2)
+            self._git('checkout', '-q', '-b', 'maintenance', 'v1')
+            self._commit('c', 3)
+            self._git('tag', '-a', '-m', 'v1.1', 'v1.1', stamp=3)
+            self._git('checkout', '-q', '-')
+            self._commit('b', 4)
+            self._commit('c', 5)
+            self._git('tag', 'v2')
+            git_statistics = gitstats2.GitTagsData({}, [gitpath])
+            repository = gitstats2.RepositoryTuple('repo', prefix_path=[])
+            git_statistics._collect_tags(repository)
+            git_statistics._collect_tags_info(repository)
+            tags = git_statistics.tags['repo']
+            expected = {}
+            prev = None
+            for tag in ['v1', 'v1-annotated', 'v1.1', 'v2'] :
+                cmd = ['git', 'shortlog', '-s', tag, *([f"^{prev}"] if prev else [])]
+                output = gitstats2.get_command_output(cmd, quiet=True)
+                expected[tag] = {}
+                for line in output.split('\n') if output else [] :
+                    commits, author = line.split('\t')
+                    expected[tag][author] = int(commits)
+                if output :
+                    prev = tag
+            os.chdir(prev_dir)
+        self.assertEqual(list(tags), ['v1', 'v1-annotated', 'v1.1', 'v2'])
+        self.assertEqual(
+            {tag : {git_statistics.get_author_name(author) : commits
+                    for author, commits in tags[tag]['authors'].items()} for tag in tags},
+            expected)
+        self.assertEqual(expected['v2'], {'a' : 1, 'b' : 1, 'c' : 1})
+        self.assertEqual(tags['v1.1']['commits'], 1)
+
+class BlameCacheMailmapTestCase(unittest.TestCase) :
+    def setUp(self) :
+        self.time_start = time.time()
+
+    def tearDown(self) :
+        time_end = time.time()
+        print(f"=== Execution time of {self.id()}, {(time_end-self.time_start):.3f}s")
+
+    def test_cached_blames_follow_mailmap(self) :
+        prev_dir = os.getcwd()
+        with tempfile.TemporaryDirectory() as gitpath, \
+             tempfile.TemporaryDirectory() as cache_dir :
+            os.chdir(gitpath)
+            GitTagsDataTestCase._git('init', '-q')
+            with open('file.txt', 'w', encoding='utf-8') as fout :
+                fout.write('a\nb\n')
+            GitTagsDataTestCase._git('add', 'file.txt')
+            GitTagsDataTestCase._git('commit', '-q', '-m', 'file', author='a')
+            commit_hash = gitstats2.get_command_output(['git', 'rev-parse', 'HEAD'], quiet=True)
+            self.assertEqual(gitstats2.GitStatisticsParallel.get_mailmap_id(), '')
+            blames = []
+            gitstats2.object_cache.open(cache_dir, 1 << 20)
+            try :
+                for mailmap in (None, 'Alias <a@example.com>\n', 'Other <a@example.com>\n') :
+                    if mailmap is not None :
+                        with open('.mailmap', 'w', encoding='utf-8') as fout :
+                            fout.write(mailmap)
+                    # the second blame of each mailmap comes from the cache
+                    for _ in range(2) :
+                        blames.append(gitstats2.GitStatisticsParallel.lines_by_authors_by_file(
+                            [(commit_hash, 'file.txt')], 2)[(commit_hash, 'file.txt')])
+                report = gitstats2.object_cache.get_report()
+            finally :
+                gitstats2.object_cache.close()
+                os.chdir(prev_dir)
+        self.assertEqual(
+            [dict(blame) for blame in blames],
+            [{'a' : 2}] * 2 + [{'Alias' : 2}] * 2 + [{'Other' : 2}] * 2)
+        self.assertEqual(len(report), 3)
+        for line in report :
+            self.assertTrue(line.endswith('1 hits, 1 misses'), line)
+
+class LinesByDateByAuthorTestCase(unittest.TestCase) :
+    def setUp(self) :
+        self.time_start = time.time()
+
+    def tearDown(self) :
+        time_end = time.time()
+        print(f"=== Execution time of {self.id()}, {(time_end-self.time_start):.3f}s")
+
+    def test_sparse_deltas(self) :
+        git_statistics = gitstats2.GitFilesStatistics({}, [])
+        git_statistics._update_lines_by_date_by_author('repo', [
+            ('1', Counter({'a' : 10})),
+            ('2', Counter({'a' : 10, 'b' : 5})),
+            ('3', None),
+            ('4', Counter({'b' : 7})),
+            ('5', Counter({'b' : 7}))])
+        self.assertEqual(git_statistics.get_lines_by_date_by_author().rows(), [
+            (1, 0, 0, 10),
+            (2, 0, 1, 5),
+            (4, 0, 1, 2), (4, 0, 0, -10),
+            (5, 0, -1, 0)])
+        self.assertEqual(list(map(git_statistics.get_author_name, (0, 1))), ['a', 'b'])
+
+class StatisticsRecordTestCase(unittest.TestCase) :
+    def setUp(self) :
+        self.time_start = time.time()
+
+    def tearDown(self) :
+        time_end = time.time()
+        print(f"=== Execution time of {self.id()}, {(time_end-self.time_start):.3f}s")
+
+    def test_access_by_name(self) :
+        stats = gitstats2.AuthorStats()
+        stats['lines_added'] += 5
+        stats.commits += 1
+        self.assertEqual((stats.lines_added, stats['commits']), (5, 1))
+        self.assertIsNone(stats.get('first_commit_stamp'))
+        self.assertEqual(stats.get('no_such_field', 0), 0)
+        with self.assertRaises(KeyError) :
+            stats['no_such_field'] = 1
+        with self.assertRaises(KeyError) :
+            _ = stats['no_such_field']
+        self.assertFalse(hasattr(stats, '__dict__'))
+
+    def test_copy_and_pickle(self) :
+        tag = gitstats2.TagInfo(1600000000, 'abc', '2020-09-13')
+        tag.authors[0] = 2
+        tag.commits = 2
+        self.assertEqual(tag.copy(), tag)
+        self.assertEqual(pickle.loads(pickle.dumps(tag, pickle.HIGHEST_PROTOCOL)), tag)
+        other = tag.copy()
+        other.commits = 3
+        self.assertNotEqual(other, tag)
+        self.assertNotEqual(gitstats2.AuthorStats(), tag)
+
+class AuthorRegistryTestCase(unittest.TestCase) :
+    def setUp(self) :
+        self.time_start = time.time()
+
+    def tearDown(self) :
+        time_end = time.time()
+        print(f"=== Execution time of {self.id()}, {(time_end-self.time_start):.3f}s")
+
+    def test_ids(self) :
+        registry = gitstats2.AuthorRegistry()
+        names = ['Marvin', 'Marian Piatkowski', 'Marvin', 'Zaphod', 'Marian Piatkowski']
+        ids = registry.get_ids(names)
+        self.assertEqual(ids, [0, 1, 0, 2, 1])
+        self.assertEqual(registry.get_id('Zaphod'), 2)
+        self.assertEqual(len(registry), 3)
+        self.assertEqual(list(map(registry.get_name, ids)), names)
+
+class ApproxLinesByAuthorTestCase(unittest.TestCase) :
+    def setUp(self) :
+        self.time_start = time.time()
+
+    def tearDown(self) :
+        time_end = time.time()
+        print(f"=== Execution time of {self.id()}, {(time_end-self.time_start):.3f}s")
+
+    def test_remove_lines_proportionally(self) :
+        lines_by_authors = Counter({'a' : 6, 'b' : 3, 'c' : 1})
+        removed = gitstats2.GitFilesStatistics._remove_lines_proportionally(lines_by_authors, 5)
+        self.assertEqual(removed, Counter({'a' : 3, 'b' : 2}))
+        self.assertEqual(lines_by_authors, Counter({'a' : 3, 'b' : 1, 'c' : 1}))
+        removed = gitstats2.GitFilesStatistics._remove_lines_proportionally(lines_by_authors, 9)
+        self.assertEqual(removed, Counter({'a' : 3, 'b' : 1, 'c' : 1}))
+        self.assertFalse(lines_by_authors)
+
+    def test_parse_numstat(self) :
+        lines = [
+            '\x1e1\x1fa',
+            '',
+            '10\t0\tREADME',
+            '-\t-\tlogo.png',
+            '\x1e2\x1fb',
+            '',
+            '2\t1\tREADME => README.md',
+            '0\t0\tlib/{old => new}/file.el',
+            '1\t0\t{ => doc}/guide.md']
+        self.assertEqual(
+            list(gitstats2.GitFilesStatistics._parse_numstat(lines)),
+            [('1', 'a', [(10, 0, 'README', 'README'), (0, 0, 'logo.png', 'logo.png')]),
+             ('2', 'b', [(2, 1, 'README', 'README.md'),
+                         (0, 0, 'lib/old/file.el', 'lib/new/file.el'),
+                         (1, 0, 'guide.md', 'doc/guide.md')])])
+
+    def test_merge_stamps(self) :
+        prev_dir = os.getcwd()
+        with tempfile.TemporaryDirectory() as gitpath :
+            os.chdir(gitpath)
+            GitTagsDataTestCase._git('init', '-q')
+            with open('README', 'w', encoding='utf8') as file :
+                file.write('a\n')
+            GitTagsDataTestCase._git('add', 'README')
+            GitTagsDataTestCase._git('commit', '-q', '-m', 'a', author='a', stamp=0)
+            GitTagsDataTestCase._git('checkout', '-q', '-b', 'side')
+            with open('README', 'a', encoding='utf8') as file :
+                file.write('b\n')
+            GitTagsDataTestCase._git('commit', '-q', '-am', 'b', author='b', stamp=1)
+            GitTagsDataTestCase._git('checkout', '-q', '-')
+            GitTagsDataTestCase._git('commit', '-q', '--allow-empty', '-m', 'a', stamp=2)
+            GitTagsDataTestCase._git('merge', '-q', '--no-ff', '-m', 'merge', 'side',
+                                     author='c', stamp=3)
+            git_statistics = gitstats2.GitFilesStatistics(
+                {'commit_end' : 'HEAD', 'start_date' : '', 'lines_by_date' : 'approx'},
+                [gitpath])
+            approx = list(git_statistics._approx_lines_by_authors_by_stamp(
+                gitstats2.RepositoryTuple('repo', prefix_path=[])))
+            os.chdir(prev_dir)
+        self.assertEqual(
+            [(int(timestamp) - 1600000000) // 86400 for timestamp, _ in approx], [0, 1, 2, 3])
+        self.assertEqual(approx[-1][1], Counter({'a' : 1, 'b' : 1}))
+
+    def test_error_against_blame(self) :
+        git_statistics = gitstats2.GitFilesStatistics(
+            {'commit_end' : 'HEAD', 'start_date' : '', 'processes' : 4,
+             'lines_by_date' : 'approx'},
+            ["/Users/tasmania/packages/test-repos-gitstats2/ABAPInEmacs/"])
+        prev_dir = os.getcwd()
+        os.chdir(git_statistics.gitpaths[0])
+        *_, (_, approx) = git_statistics._approx_lines_by_authors_by_stamp(
+            gitstats2.RepositoryTuple('ABAPInEmacs', prefix_path=[]))
+        commit_hash = gitstats2.get_command_output(['git', 'rev-parse', 'HEAD'], quiet=True)
+        file_tree = gitstats2.get_command_output(
+            ['git', 'ls-tree', '-r', '--name-only', commit_hash], quiet=True).split('\n')
+        exact = gitstats2.GitStatisticsParallel.lines_by_authors(file_tree, commit_hash, 4)
+        os.chdir(prev_dir)
+        # share of the lines attributed to another author than git blame does
+        error = sum(abs(approx[author] - exact[author]) for author in set(approx) | set(exact)) \
+            / (2 * sum(exact.values()))
+        # lines written while resolving merge conflicts are not followed
+        print(f"lines_by_date=approx misattributes {error:.2%} of the lines, "
+              "merge conflict resolutions left out")
+        self.assertLess(error, 0.25)
+
+class GitStatisticsSinglePassTestCase(unittest.TestCase) :
+    def setUp(self) :
+        self.time_start = time.time()
+
+    def tearDown(self) :
+        time_end = time.time()
+        print(f"=== Execution time of {self.id()}, {(time_end-self.time_start):.3f}s")
+
+    @staticmethod
+    def _collect(single_pass, linear_linestats, commit_end='HEAD', incremental=0, index_dir=None,
+                 gitpath="/Users/tasmania/packages/test-repos-gitstats2/ABAPInEmacs/",
+                 lines_by_date=0) :
+        conf = {
+            'max_domains': 10,
+            'max_ext_length': 10,
+            'max_authors': 20,
+            'authors_top': 5,
+            'commit_begin': '',
+            'commit_end': commit_end,
+            'linear_linestats': linear_linestats,
+            'project_name': '',
+            'processes': 4,
+            'start_date': '',
+            'lines_by_date': lines_by_date,
+            'single_pass': single_pass,
+            'incremental': incremental,
+            'cache_dir': '',
+            'cache_max_mb': 512,
+            'lines_by_date_sampling': '',
+            'executor': 'thread',
+            'spooled_output': 0,
+            'shortstat_shards': 0,
+        }
+        git_statistics = gitstats2.GitStatisticsData(conf, [gitpath])
+        git_statistics.collect(index_dir)
+        return git_statistics
+
+    @staticmethod
+    def _by_author_name(git_statistics, attribute) :
+        # the author ids depend on the order the collect phases meet the authors
+        value = getattr(git_statistics, attribute)
+        get_name = git_statistics.get_author_name
+        if attribute == 'total_authors' :
+            return set(map(get_name, value))
+        if attribute == 'authors' :
+            return {get_name(author) : stats for author, stats in value.items()}
+        if attribute in ('author_of_month', 'author_of_year') :
+            return {key : {get_name(author) : stats for author, stats in by_author.items()}
+                    for key, by_author in value.items()}
+        if attribute == 'changes_by_date_by_author' :
+            # rows of the same stamp may come in another order
+            return sorted((stamp, repository, get_name(author), *changes)
+                          for stamp, repository, author, *changes in value.rows())
+        return value
+
+    def _assert_same_statistics(self, actual, expected) :
+        for attribute in (
+                'total_authors', 'authors', 'total_commits', 'domains',
+                'changes_by_date', 'changes_by_date_by_author', 'total_lines',
+                'total_lines_added', 'total_lines_removed', 'author_of_month',
+                'author_of_year', 'active_days', 'commits_by_timezone',
+                'files_by_stamp', 'total_files', 'extensions') :
+            self.assertEqual(
+                self._by_author_name(actual, attribute),
+                self._by_author_name(expected, attribute), attribute)
+        self.assertEqual(
+            list(self._by_author_name(actual, 'authors')),
+            list(self._by_author_name(expected, 'authors')))
+
+    def test_single_pass_linear(self) :
+        self._assert_same_statistics(self._collect(1, 1), self._collect(0, 1))
+
+    def test_single_pass_nonlinear(self) :
+        self._assert_same_statistics(self._collect(1, 0), self._collect(0, 0))
+
+    @staticmethod
+    def _lines_by_authors_by_stamp(lines_by_date_sampling) :
+        git_statistics = gitstats2.GitFilesStatistics(
+            {'commit_end' : 'HEAD', 'start_date' : '', 'processes' : 4,
+             'lines_by_date_sampling' : lines_by_date_sampling},
+            ["/Users/tasmania/packages/test-repos-gitstats2/ABAPInEmacs/"])
+        prev_dir = os.getcwd()
+        os.chdir(git_statistics.gitpaths[0])
+        log_range = git_statistics.get_log_range_args('HEAD')
+        cmd = ['git', 'rev-list', '--reverse', '--pretty=format:%at %T %H', *log_range]
+        lines = list(gitstats2.skip_commit_lines(gitstats2.get_command_lines(cmd)))
+        time_files_commit = gitstats2.GitStatisticsParallel.file_tree_by_revlist(lines, [])
+        lines_by_authors_by_stamp = git_statistics._lines_by_authors_by_stamp(
+            gitstats2.RepositoryTuple('ABAPInEmacs', prefix_path=[]),
+            time_files_commit, log_range)
+        expected = [
+            (timestamp, gitstats2.GitStatisticsParallel.lines_by_authors(file_tree, commit_hash, 4))
+            for timestamp, file_tree, commit_hash in time_files_commit]
+        os.chdir(prev_dir)
+        return (git_statistics, lines_by_authors_by_stamp, expected)
+
+    def test_lines_by_date_incremental_blame(self) :
+        _, lines_by_authors_by_stamp, expected = self._lines_by_authors_by_stamp('')
+        self.assertEqual(lines_by_authors_by_stamp, expected)
+
+    def test_lines_by_date_sampling(self) :
+        git_statistics, lines_by_authors_by_stamp, expected = \
+            self._lines_by_authors_by_stamp('5')
+        sampled = [(timestamp, lines_by_authors)
+                   for timestamp, lines_by_authors in lines_by_authors_by_stamp
+                   if lines_by_authors is not None]
+        self.assertEqual(len(sampled), 5)
+        self.assertEqual(sampled[-1], expected[-1])
+        for sample in sampled :
+            self.assertIn(sample, expected)
+        sampling = git_statistics.get_lines_by_date_sampling()['ABAPInEmacs']
+        self.assertEqual(sampling['stamps'], [timestamp for timestamp, _ in sampled])
+        self.assertLessEqual(sampling['blames'], sampling['total_blames'])
+
+    @staticmethod
+    def _git(*args, stamp=0) :
+        env = dict(os.environ,
+                   GIT_AUTHOR_NAME='a', GIT_AUTHOR_EMAIL='a@example.com',
+                   GIT_COMMITTER_NAME='a', GIT_COMMITTER_EMAIL='a@example.com',
+                   GIT_AUTHOR_DATE=f"{1600000000 + stamp * 3600} +0000",
+                   GIT_COMMITTER_DATE=f"{1600000000 + stamp * 3600} +0000")
+        subprocess.run(['git', *args], env=env, check=True, stdout=subprocess.DEVNULL)
+
+    def test_first_parent_line_with_clock_skew(self) :
+        # The mainline commit after the fork is dated before its parent and the side
+        # branch after it, so `git log` shows the parent before its first-parent child.
+        prev_dir = os.getcwd()
+        with tempfile.TemporaryDirectory() as gitpath :
+            os.chdir(gitpath)
+            self._git('init', '-q')
+            self._git('commit', '-q', '--allow-empty', '-m', 'base', stamp=10)
+            self._git('checkout', '-q', '-b', 'side')
+            self._git('commit', '-q', '--allow-empty', '-m', 'side', stamp=50)
+            self._git('checkout', '-q', '-')
+            self._git('commit', '-q', '--allow-empty', '-m', 'skewed', stamp=5)
+            self._git('merge', '-q', '--no-ff', '-m', 'merge', 'side', stamp=60)
+            git_statistics = gitstats2.GitStatisticsData({}, [gitpath])
+            records, next_first_parent = git_statistics._get_history_records(['HEAD'])
+            first_parent_line = gitstats2.get_command_output(
+                ['git', 'rev-list', '--first-parent', 'HEAD'], quiet=True).split()
+            self.assertCountEqual(
+                [record.commit_hash for record in records if record.on_first_parent_line],
+                first_parent_line)
+            self.assertIsNone(next_first_parent)
+            base = first_parent_line[-1]
+            records, next_first_parent = git_statistics._get_history_records([f"{base}..HEAD"])
+            self.assertEqual(len(records), 3)
+            self.assertEqual(next_first_parent, base)
+            os.chdir(prev_dir)
+
+    def test_incremental(self) :
+        with tempfile.TemporaryDirectory() as index_dir :
+            self._collect(0, 1, commit_end='HEAD~5', incremental=1, index_dir=index_dir)
+            actual = self._collect(0, 1, incremental=1, index_dir=index_dir)
+            self.assertEqual(len(os.listdir(index_dir)), 1)
+        self._assert_same_statistics(actual, self._collect(0, 1))
+
+    @staticmethod
+    def _commit_file(filename, text, author, stamp) :
+        with open(filename, 'a', encoding='utf8') as file :
+            file.write(text)
+        GitTagsDataTestCase._git('add', filename)
+        GitTagsDataTestCase._git('commit', '-q', '-m', text, author=author, stamp=stamp)
+
+    @staticmethod
+    def _lines_by_date_by_author(git_statistics) :
+        get_name = git_statistics.get_author_name
+        return sorted((stamp, repository, get_name(author) if author != -1 else None, delta)
+                      for stamp, repository, author, delta in
+                      git_statistics.lines_by_date_by_author.rows())
+
+    def test_incremental_merged_side_branch(self) :
+        # The side branch is older than the indexed commits of the mainline, so a full
+        # walk lists its commits between them.
+        prev_dir = os.getcwd()
+        with tempfile.TemporaryDirectory() as gitpath, \
+             tempfile.TemporaryDirectory() as index_dir :
+            os.chdir(gitpath)
+            GitTagsDataTestCase._git('init', '-q')
+            self._commit_file('README', 'base\n', 'a', 1)
+            GitTagsDataTestCase._git('checkout', '-q', '-b', 'side')
+            self._commit_file('side.txt', 'side\n', 'b', 2)
+            GitTagsDataTestCase._git('checkout', '-q', '-')
+            self._commit_file('main.txt', 'main\n', 'a', 3)
+            self._commit_file('README', 'main\n', 'a', 4)
+            for linear_linestats in (0, 1) :
+                os.mkdir(os.path.join(index_dir, str(linear_linestats)))
+                self._collect(0, linear_linestats, incremental=1, gitpath=gitpath,
+                              index_dir=os.path.join(index_dir, str(linear_linestats)),
+                              lines_by_date=1)
+            GitTagsDataTestCase._git('merge', '-q', '--no-ff', '-m', 'merge', 'side', stamp=5)
+            for linear_linestats in (0, 1) :
+                self._assert_incremental_same_as_full(
+                    gitpath, os.path.join(index_dir, str(linear_linestats)), linear_linestats)
+            # appended to the rebuilt index, the deltas of lines by author continue from it
+            self._commit_file('side.txt', 'more\n', 'b', 6)
+            for linear_linestats in (0, 1) :
+                self._assert_incremental_same_as_full(
+                    gitpath, os.path.join(index_dir, str(linear_linestats)), linear_linestats)
+            os.chdir(prev_dir)
+
+    def _assert_incremental_same_as_full(self, gitpath, index_dir, linear_linestats) :
+        actual = self._collect(0, linear_linestats, incremental=1, gitpath=gitpath,
+                               index_dir=index_dir, lines_by_date=1)
+        expected = self._collect(0, linear_linestats, gitpath=gitpath, lines_by_date=1)
+        self._assert_same_statistics(actual, expected)
+        self.assertEqual(self._lines_by_date_by_author(actual),
+                         self._lines_by_date_by_author(expected))
+
 class RequireCWDGitTestCase(unittest.TestCase) :
     def setUp(self) :
         self.time_start = time.time()
@@ -0,0 +1,68 @@
+# -*- python-indent-offset: 4 -*-
+"""
+Copyright (C) 2021-  Marian Piatkowski
+
+This file is a part of GitStats2.
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, version 3.
+
+This program is distributed in the hope that it will be useful, but
+WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import os
+import tempfile
+import unittest
+from gitstats2_commit_index import CommitIndex, CommitIndexRecord
+
+class CommitIndexTestCase(unittest.TestCase) :
+    def tearDown(self) :
+        print(f"=== {self.id()}")
+
+    @staticmethod
+    def _record(stamp, commit_hash) :
+        return CommitIndexRecord(
+            stamp, '+0100', 'tree', commit_hash, 'author', 'author@example.com',
+            False, True, None, num_files=1, delta_lines_by_authors=None)
+
+    def test_save_and_load(self) :
+        fingerprint = ('/path/to/repo', '', 1, 0)
+        with tempfile.TemporaryDirectory() as index_dir :
+            index = CommitIndex.load(index_dir, 'repo', fingerprint)
+            self.assertFalse(index.last_head)
+            index.extend('c1', [self._record('1', 'c1')], {})
+            index.save(index_dir, 'repo')
+            index = CommitIndex.load(index_dir, 'repo', fingerprint)
+            index.extend('c2', [self._record('2', 'c2')], {'author' : 3})
+            index.save(index_dir, 'repo')
+            index = CommitIndex.load(index_dir, 'repo', fingerprint)
+            self.assertEqual(os.listdir(index_dir), ['gitstats2_index_repo.pkl'])
+        self.assertEqual(index.last_head, 'c2')
+        self.assertEqual(index.last_lines_by_authors, {'author' : 3})
+        self.assertEqual([record.commit_hash for record in index.records], ['c1', 'c2'])
+
+    def test_other_settings_discard_index(self) :
+        with tempfile.TemporaryDirectory() as index_dir :
+            index = CommitIndex.load(index_dir, 'repo', ('/path/to/repo', '', 1, 0))
+            index.extend('c1', [self._record('1', 'c1')], {})
+            index.save(index_dir, 'repo')
+            index = CommitIndex.load(index_dir, 'repo', ('/path/to/repo', '', 0, 0))
+        self.assertFalse(index.last_head)
+        self.assertFalse(index.records)
+
+    def test_unreadable_index(self) :
+        with tempfile.TemporaryDirectory() as index_dir :
+            with open(CommitIndex.get_filename(index_dir, 'repo'), 'wb') as fout :
+                fout.write(b'garbage')
+            index = CommitIndex.load(index_dir, 'repo', ('/path/to/repo', '', 1, 0))
+        self.assertFalse(index.records)
+
+if __name__ == '__main__' :
+    unittest.main()
@@ -0,0 +1,74 @@
+# -*- python-indent-offset: 4 -*-
+"""
+Copyright (C) 2021-  Marian Piatkowski
+
+This file is a part of GitStats2.
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, version 3.
+
+This program is distributed in the hope that it will be useful, but
+WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import pickle
+import unittest
+import gitstats2_commit_table
+from gitstats2_commit_table import CommitTable
+
+class CommitTableTestCase(unittest.TestCase) :
+    def tearDown(self) :
+        print(f"=== {self.id()}")
+
+    @staticmethod
+    def _table() :
+        table = CommitTable(('inserted', 'deleted'))
+        # a stamp with fewer digits sorts first, rows of a stamp keep their order
+        table.append(1000000000, 0, 5, 1)
+        table.append(999999999, 0, 7, 0)
+        table.append(1000000000, 1, 2, 2)
+        table.append(1000000000, 0, 3, 4)
+        return table
+
+    def _assert_sorted(self, table) :
+        self.assertEqual(table.get_order(), [1, 0, 3, 2])
+        self.assertEqual(
+            [(stamp, repository, rows) for stamp, repository, rows in table.groups()],
+            [(999999999, 0, [1]), (1000000000, 0, [0, 3]), (1000000000, 1, [2])])
+        self.assertEqual(table.rows()[1], (1000000000, 0, 5, 1))
+
+    def test_sorted_once(self) :
+        table = self._table()
+        self._assert_sorted(table)
+        order = table.get_order()
+        self.assertIs(table.get_order(), order)
+        table.append(1, 0, 0, 0)
+        self.assertEqual(table.get_order()[0], 4)
+        self.assertEqual(len(table), 5)
+
+    def test_without_numpy(self) :
+        numpy_module = gitstats2_commit_table.np
+        gitstats2_commit_table.np = None
+        try :
+            self._assert_sorted(self._table())
+        finally :
+            gitstats2_commit_table.np = numpy_module
+
+    def test_columns_and_pickle(self) :
+        table = self._table()
+        self.assertEqual(list(table.column('inserted')), [5, 7, 2, 3])
+        self.assertEqual(memoryview(table.column('stamp')).itemsize, 8)
+        loaded = pickle.loads(pickle.dumps(table, pickle.HIGHEST_PROTOCOL))
+        self.assertEqual(loaded, table)
+        self._assert_sorted(loaded)
+        loaded.append(1, 0, 0, 0)
+        self.assertNotEqual(loaded, table)
+
+if __name__ == '__main__' :
+    unittest.main()
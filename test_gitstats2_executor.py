@@ -0,0 +1,92 @@
+# -*- python-indent-offset: 4 -*-
+"""
+Copyright (C) 2021-  Marian Piatkowski
+
+This file is a part of GitStats2.
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, version 3.
+
+This program is distributed in the hope that it will be useful, but
+WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import os
+import time
+import tempfile
+import unittest
+import gitstats2_collect_data as gitstats2
+from gitstats2_executor import SharedExecutor, shared_executor
+
+def get_cwd(_arg) :
+    return os.getcwd()
+
+class SharedExecutorTestCase(unittest.TestCase) :
+    def tearDown(self) :
+        print(f"=== {self.id()}")
+
+    def test_unknown_backend(self) :
+        executor = SharedExecutor()
+        with self.assertRaises(ValueError) :
+            executor.configure('greenlet', 4)
+
+    def test_started_once(self) :
+        executor = SharedExecutor()
+        executor.configure('thread', 2)
+        self.assertEqual(executor.map(abs, [-1, -2, 3]), [1, 2, 3])
+        started = executor.executor
+        self.assertEqual(executor.map(abs, [-4]), [4])
+        self.assertIs(executor.executor, started)
+        executor.close()
+        self.assertIsNone(executor.executor)
+
+    def test_imap_unordered(self) :
+        for backend in ('thread', 'process') :
+            executor = SharedExecutor()
+            executor.configure(backend, 2)
+            results = list(executor.imap_unordered(abs, range(-20, 0)))
+            executor.close()
+            self.assertEqual(sorted(results), [(i, -i) for i in range(-20, 0)])
+
+    def test_process_workers_follow_cwd(self) :
+        executor = SharedExecutor()
+        executor.configure('process', 2)
+        prev_dir = os.getcwd()
+        try :
+            executor.map(get_cwd, range(4))
+            with tempfile.TemporaryDirectory() as tmpdir :
+                os.chdir(tmpdir)
+                cwds = executor.map(get_cwd, range(4))
+                os.chdir(prev_dir)
+                self.assertEqual(cwds, [os.path.realpath(tmpdir)] * 4)
+        finally :
+            os.chdir(prev_dir)
+            executor.close()
+
+    def test_backends_blame(self) :
+        # same blames on both backends, the timings are printed for comparison
+        gitpath = os.path.dirname(os.path.abspath(__file__))
+        prev_dir = os.getcwd()
+        os.chdir(gitpath)
+        commit_hash = gitstats2.get_command_output(['git', 'rev-parse', 'HEAD'], quiet=True)
+        file_tree = gitstats2.get_command_output(
+            ['git', 'ls-tree', '-r', '--name-only', commit_hash], quiet=True).split('\n')
+        lines_by_authors = {}
+        for backend in ('process', 'thread') :
+            shared_executor.configure(backend, 4)
+            start = time.time()
+            lines_by_authors[backend] = gitstats2.GitStatisticsParallel.lines_by_authors(
+                file_tree, commit_hash, 4)
+            print(f"{backend} backend: {len(file_tree)} blames in {(time.time()-start):.3f}s")
+            shared_executor.close()
+        os.chdir(prev_dir)
+        self.assertEqual(lines_by_authors['thread'], lines_by_authors['process'])
+
+if __name__ == '__main__' :
+    unittest.main()
@@ -18,7 +18,10 @@ along with this program. If not, see <http://www.gnu.org/licenses/>.
 """
 
 import os
+import re
 import unittest
+import tempfile
+import subprocess
 import gitstats2_collect_data as gitstats2
 from gitstats2_collect_data import \
     ShortStatParserState, \
@@ -131,11 +134,243 @@ class LogShortStatParserTestCase(unittest.TestCase) :
             prev_state = self.current_state
         os.chdir(prev_dir)
 
+    def test_parse_streamed_chronological(self) :
+        gitpath = "/Users/tasmania/packages/weather-metno-el/"
+        prev_dir = os.getcwd()
+        os.chdir(gitpath)
+        extra = '--reverse --date-order'
+        cmd = f"git log --shortstat {extra} --pretty=format:\"%at %aN\" HEAD"
+        prev_state = self.current_state
+        for line in gitstats2.get_pipe_lines([cmd]) :
+            self.decide(line)
+            if prev_state == ShortStatParserState.Initial :
+                self.assertEqual(self.current_state, ShortStatParserState.CommitInfo)
+            if prev_state == ShortStatParserState.CommitInfo :
+                self.assertIn(
+                    self.current_state,
+                    (ShortStatParserState.CommitInfo, ShortStatParserState.ChangesByCommit))
+            if prev_state == ShortStatParserState.ChangesByCommit :
+                self.assertIn(
+                    self.current_state,
+                    (ShortStatParserState.Initial, ShortStatParserState.CommitInfo))
+            prev_state = self.current_state
+        os.chdir(prev_dir)
+
     def decide(self, line) :
         self.decide_in_state[self.current_state](self, line)
 
     def toggle(self, target_state) :
         self.current_state = target_state
 
+class MarkedShortStatParserTestCase(unittest.TestCase) :
+    def tearDown(self) :
+        print(f"=== {self.id()}")
+
+    @staticmethod
+    def _git(*args, stamp=0) :
+        env = dict(os.environ,
+                   GIT_AUTHOR_NAME=f"author {stamp % 3}", GIT_AUTHOR_EMAIL='a@example.com',
+                   GIT_COMMITTER_NAME='c', GIT_COMMITTER_EMAIL='c@example.com',
+                   GIT_AUTHOR_DATE=f"{1600000000 + stamp * 3600} +0000",
+                   GIT_COMMITTER_DATE=f"{1600000000 + stamp * 3600} +0000")
+        subprocess.run(['git', *args], env=env, check=True, stdout=subprocess.DEVNULL)
+
+    def _make_history(self) :
+        # commits adding, removing and both, an empty commit, a binary file and a merge
+        self._git('init', '-q')
+        for stamp, content in enumerate(['a\nb\nc\n', 'a\n', 'a\nx\ny\n', 'a\nx\ny\n']) :
+            with open('file.txt', 'w', encoding='utf-8') as fout :
+                fout.write(content)
+            self._git('add', 'file.txt')
+            self._git('commit', '-q', '--allow-empty', '-m', str(stamp), stamp=stamp)
+        self._git('checkout', '-q', '-b', 'side', 'HEAD~2')
+        with open('image.bin', 'wb') as fout :
+            fout.write(bytes(range(256)))
+        self._git('add', 'image.bin')
+        self._git('commit', '-q', '-m', 'binary', stamp=4)
+        self._git('checkout', '-q', '-')
+        self._git('merge', '-q', '--no-ff', '-m', 'merge', 'side', stamp=5)
+
+    @staticmethod
+    def _parse(args, update, marked) :
+        parser = gitstats2.LogShortStatData({'start_date' : '', 'commit_end' : 'HEAD'}, [])
+        pretty = '--pretty=format:%x1e%at %aN' if marked else '--pretty=format:%at %aN'
+        lines = gitstats2.get_command_lines(['git', 'log', '--shortstat', *args, pretty, 'HEAD'])
+        repository = gitstats2.RepositoryTuple('repo', prefix_path=[])
+        if update == 'by_author' :
+            parser._parse_log_shortstat(
+                repository, lines, parser._update_lines_modified_by_author,
+                parser._update_merge_commit, marked=marked)
+        else :
+            parser._parse_log_shortstat(
+                repository, lines, parser._update_lines_modified, parser.do_nothing,
+                marked=marked)
+        return parser
+
+    def test_marked_same_as_state_machine(self) :
+        prev_dir = os.getcwd()
+        with tempfile.TemporaryDirectory() as gitpath :
+            os.chdir(gitpath)
+            self._make_history()
+            for args, update in (
+                    (['--reverse', '--first-parent', '-m'], 'lines'),
+                    (['--reverse'], 'lines'),
+                    (['--reverse', '--date-order'], 'by_author')) :
+                expected = self._parse(args, update, marked=False)
+                actual = self._parse(args, update, marked=True)
+                self.assertEqual(actual.changes_by_date, expected.changes_by_date, args)
+                self.assertEqual(
+                    actual.changes_by_date_by_author, expected.changes_by_date_by_author, args)
+                self.assertEqual(
+                    actual._authors_of_repository, expected._authors_of_repository, args)
+            # the empty commit comes without changes like the merge
+            self.assertEqual(
+                list(actual.changes_by_date_by_author.column('merge_commit')), [0, 0, 0, 1, 0, 1])
+            os.chdir(prev_dir)
+
+    @staticmethod
+    def _parse_spooled(args, update) :
+        parser = gitstats2.LogShortStatData({'start_date' : '', 'commit_end' : 'HEAD'}, [])
+        cmd = ['git', 'log', '--shortstat', *args, '--pretty=format:%x1e%at %aN', 'HEAD']
+        with gitstats2.get_command_buffer(cmd) as output :
+            for stamp, author, changes_by_commit in parser.parse_marked_shortstat(output) :
+                author = parser.author_registry.get_id_of_bytes(author)
+                if update == 'by_author' and changes_by_commit is None :
+                    parser._add_merge_commit('repo', stamp, author)
+                elif update == 'by_author' :
+                    parser._add_lines_modified_by_author(
+                        'repo', stamp, author, changes_by_commit)
+                elif changes_by_commit is not None :
+                    parser._add_lines_modified('repo', stamp, changes_by_commit)
+        return parser
+
+    def test_spooled_same_as_lines(self) :
+        prev_dir = os.getcwd()
+        with tempfile.TemporaryDirectory() as gitpath :
+            os.chdir(gitpath)
+            self._make_history()
+            # a commit with a Latin-1 author name, git commit would convert it to UTF-8
+            with open('file.txt', 'a', encoding='utf-8') as fout :
+                fout.write('z\n')
+            self._git('add', 'file.txt')
+            tree = gitstats2.get_command_output(['git', 'write-tree'], quiet=True)
+            head = gitstats2.get_command_output(['git', 'rev-parse', 'HEAD'], quiet=True)
+            commit = subprocess.run(
+                ['git', 'hash-object', '-w', '-t', 'commit', '--stdin'],
+                input=f"tree {tree}\nparent {head}\n".encode() +
+                b'author J\xf6rg <j@example.com> 1600030000 +0000\n'
+                b'committer c <c@example.com> 1600030000 +0000\n\nlatin-1\n',
+                stdout=subprocess.PIPE, check=True).stdout.decode().strip()
+            self._git('update-ref', 'HEAD', commit)
+            for args, update in (
+                    (['--reverse', '--first-parent', '-m'], 'lines'),
+                    (['--reverse', '--date-order'], 'by_author')) :
+                expected = self._parse(args, update, marked=True)
+                actual = self._parse_spooled(args, update)
+                self.assertEqual(actual.changes_by_date, expected.changes_by_date, args)
+                self.assertEqual(
+                    actual.changes_by_date_by_author, expected.changes_by_date_by_author, args)
+                self.assertEqual(
+                    actual._authors_of_repository, expected._authors_of_repository, args)
+            self.assertEqual(actual.author_registry.names, expected.author_registry.names)
+            self.assertIn('J\ufffdrg', actual.author_registry.names)
+            os.chdir(prev_dir)
+
+    def test_records_closed_when_not_read_to_the_end(self) :
+        prev_dir = os.getcwd()
+        with tempfile.TemporaryDirectory() as gitpath :
+            os.chdir(gitpath)
+            self._make_history()
+            try :
+                for shortstat_shards in (0, 2) :
+                    parser = gitstats2.LogShortStatData(
+                        {'processes' : 2, 'spooled_output' : 1,
+                         'shortstat_shards' : shortstat_shards}, [])
+                    args = (['--reverse'], ['HEAD'], [])
+                    with parser._open_shortstat_records(*args) as records :
+                        self.assertEqual(len(next(records)), 3)
+                    with self.assertRaises(KeyError) :
+                        with parser._open_shortstat_records(*args) as records :
+                            raise KeyError(next(records))
+            finally :
+                gitstats2.shared_executor.close()
+                os.chdir(prev_dir)
+
+    def test_spooled_empty_output(self) :
+        with gitstats2.get_command_buffer(['git', '--version']) as output :
+            self.assertTrue(output[:].startswith(b'git version'))
+        with gitstats2.get_command_buffer(['git', 'config', '--get', 'no.such-key']) as output :
+            self.assertEqual(output, b'')
+            self.assertEqual(list(gitstats2.LogShortStatData.parse_marked_shortstat(output)), [])
+
+    @staticmethod
+    def _collect_sharded(shortstat_shards, linear_linestats) :
+        parser = gitstats2.LogShortStatData(
+            {'start_date' : '', 'commit_begin' : '', 'commit_end' : 'HEAD', 'processes' : 2,
+             'linear_linestats' : linear_linestats, 'spooled_output' : 0,
+             'shortstat_shards' : shortstat_shards}, [])
+        parser._authors_of_repository = {}
+        repository = gitstats2.RepositoryTuple('repo', prefix_path=[])
+        parser._collect_lines_modified(repository)
+        parser._collect_lines_modified_by_author(repository)
+        return parser
+
+    def test_sharded_same_as_sequential(self) :
+        prev_dir = os.getcwd()
+        with tempfile.TemporaryDirectory() as gitpath :
+            os.chdir(gitpath)
+            self._make_history()
+            try :
+                for linear_linestats in (1, 0) :
+                    expected = self._collect_sharded(0, linear_linestats)
+                    # more shards than commits as well
+                    for shortstat_shards in (2, 3, 100) :
+                        actual = self._collect_sharded(shortstat_shards, linear_linestats)
+                        for attribute in (
+                                'total_lines', 'total_lines_added', 'total_lines_removed',
+                                'changes_by_date', 'changes_by_date_by_author',
+                                '_authors_of_repository', 'lines_added_by_month') :
+                            self.assertEqual(
+                                getattr(actual, attribute), getattr(expected, attribute),
+                                (attribute, linear_linestats, shortstat_shards))
+            finally :
+                gitstats2.shared_executor.close()
+                os.chdir(prev_dir)
+
+    def test_failed_shard_raises(self) :
+        prev_dir = os.getcwd()
+        with tempfile.TemporaryDirectory() as gitpath :
+            os.chdir(gitpath)
+            self._make_history()
+            head = gitstats2.get_command_output(['git', 'rev-parse', 'HEAD'], quiet=True)
+            chunk = (0, [head, '0' * 39 + '1'], ['--no-walk=unsorted'], [])
+            try :
+                with self.assertRaises(RuntimeError) as context :
+                    gitstats2.GitStatisticsParallel.shortstat_of_commits(chunk, quiet=True)
+            finally :
+                os.chdir(prev_dir)
+        self.assertIn('exit status 128', str(context.exception))
+        self.assertIn('0' * 39 + '1', str(context.exception))
+
+    @staticmethod
+    def _get_modified_counts_by_regex(line) :
+        # the parsing of the counts before the fast path
+        numbers = tuple(map(int, re.findall(r'\d+', line)))
+        if len(numbers) == 1 :
+            return (numbers[0], 0, 0)
+        if len(numbers) == 2 and line.find('(+)') != -1 :
+            return (numbers[0], numbers[1], 0)
+        if len(numbers) == 2 and line.find('(-)') != -1 :
+            return (numbers[0], 0, numbers[1])
+        return numbers
+
+    def test_modified_counts_without_regex(self) :
+        for line in (' 1 file changed, 1 insertion(+)', ' 2 files changed, 3 deletions(-)',
+                     ' 12 files changed, 140 insertions(+), 7 deletions(-)',
+                     ' 1 file changed, 0 insertions(+), 0 deletions(-)', ' 1 file changed') :
+            self.assertEqual(
+                tuple(gitstats2.LogShortStatData._get_modified_counts(line)),
+                self._get_modified_counts_by_regex(line), line)
+
 if __name__ == '__main__' :
     unittest.main()
@@ -0,0 +1,96 @@
+# -*- python-indent-offset: 4 -*-
+"""
+Copyright (C) 2021-  Marian Piatkowski
+
+This file is a part of GitStats2.
+
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, version 3.
+
+This program is distributed in the hope that it will be useful, but
+WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the GNU
+General Public License for more details.
+
+You should have received a copy of the GNU General Public License
+along with this program. If not, see <http://www.gnu.org/licenses/>.
+"""
+
+import os
+import json
+import tempfile
+import unittest
+from multiprocessing import Pool
+from functools import partial
+from gitstats2_trace import ExecutionTrace
+import gitstats2_collect_data as gitstats2
+
+class ExecutionTraceTestCase(unittest.TestCase) :
+    def tearDown(self) :
+        print(f"=== {self.id()}")
+
+    def test_phase_and_command_events(self) :
+        trace = ExecutionTrace()
+        with trace.phase('collect', 'repo') :
+            trace.add_command('git log', 'git log --shortstat', 10.0, 10.5, 42)
+        self.assertEqual([event['cat'] for event in trace.events], ['command', 'phase'])
+        self.assertEqual(trace.events[0]['args']['bytes_out'], 42)
+        self.assertEqual(trace.events[0]['pid'], os.getpid())
+        self.assertAlmostEqual(trace.get_command_time(), 0.5)
+
+    def test_take_since_and_merge(self) :
+        trace = ExecutionTrace()
+        trace.add_command('git log', 'git log', 1.0, 2.0, 0)
+        mark = trace.mark()
+        trace.add_command('git blame', 'git blame', 2.0, 4.0, 0)
+        events = trace.take_since(mark)
+        self.assertEqual(len(trace.events), 1)
+        trace.merge(events)
+        self.assertAlmostEqual(trace.get_command_time(), 3.0)
+
+    def test_command_wall_time(self) :
+        # overlapping commands of parallel workers count once
+        trace = ExecutionTrace()
+        trace.add_command('git blame', 'git blame a', 1.0, 3.0, 0)
+        trace.add_command('git blame', 'git blame b', 2.0, 2.5, 0)
+        trace.add_command('git blame', 'git blame c', 2.5, 4.0, 0)
+        trace.add_command('git log', 'git log', 5.0, 6.0, 0)
+        with trace.phase('collect', 'repo') :
+            pass
+        self.assertAlmostEqual(trace.get_command_time(), 5.0)
+        self.assertAlmostEqual(trace.get_command_wall_time(), 4.0)
+        self.assertEqual(ExecutionTrace().get_command_wall_time(), 0)
+
+    def test_write_chrome_trace(self) :
+        trace = ExecutionTrace()
+        trace.add_command('git log', 'git log', 2.0, 3.0, 0)
+        trace.add_command('git log', 'git log', 1.0, 2.0, 0)
+        with tempfile.TemporaryDirectory() as tmpdir :
+            outputfilename = os.path.join(tmpdir, 'trace.json')
+            trace.write(outputfilename)
+            with open(outputfilename, 'r', encoding='utf-8') as inputfile :
+                content = json.load(inputfile)
+        stamps = [event['ts'] for event in content['traceEvents']]
+        self.assertEqual(stamps, sorted(stamps))
+
+    def test_worker_events_merged(self) :
+        gitpath = os.path.dirname(os.path.abspath(__file__))
+        prev_dir = os.getcwd()
+        os.chdir(gitpath)
+        mark = gitstats2.execution_trace.mark()
+        with Pool(processes=2) as pool :
+            results = gitstats2.GitStatisticsParallel.merge_traced_results(pool.map(
+                partial(gitstats2.GitStatisticsParallel.traced_call,
+                        partial(gitstats2.get_command_output, quiet=True)),
+                [['git', 'rev-parse', 'HEAD'], ['git', '--version']]))
+            pool.terminate()
+            pool.join()
+        events = gitstats2.execution_trace.take_since(mark)
+        os.chdir(prev_dir)
+        self.assertEqual(len(results), 2)
+        self.assertEqual(sorted(event['name'] for event in events), ['git', 'git rev-parse'])
+        self.assertNotIn(os.getpid(), [event['pid'] for event in events])
+
+if __name__ == '__main__' :
+    unittest.main()